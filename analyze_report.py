@@ -8,900 +8,331 @@
 4. 生成详细的埋点质量报告
 """
 
-import json
 import os
-from collections import Counter, defaultdict
+import sys
+import time
+from bisect import bisect_left
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Set, Tuple
+from heapq import nlargest
+from itertools import chain, islice
+from operator import itemgetter, methodcaller
+from pathlib import Path
+from string import Template
+from typing import List, Dict, Tuple, Iterable, NamedTuple
 
+from json_utils import json_loads
 
-class BuryPointAnalyzer:
-    """埋点分析器"""
-    
-    # 埋点域名（可配置）
-    BURY_POINT_DOMAIN = "dc.cmicapm.com"
-    
-    # 时间窗口：点击后多久内的埋点算作匹配（毫秒）
-    TIME_WINDOW_MS = 10000  # 扩大到10秒，适应网络延迟
-    
-    def __init__(self, mitm_file: str = None, click_log_file: str = None):
-        """
-        Args:
-            mitm_file: MITM捕获文件 (mitm_requests_*.jsonl)
-            click_log_file: 点击日志文件 (click_log_*.jsonl)
-        """
-        # 自动查找最新文件
-        if not mitm_file:
-            mitm_file = self._find_latest_file("mitm_requests_")
-        if not click_log_file:
-            click_log_file = self._find_latest_file("click_log_")
-        
-        self.mitm_file = mitm_file
-        self.click_log_file = click_log_file
-        
-        print(f"📁 使用文件:")
-        print(f"   MITM: {mitm_file}")
-        print(f"   点击日志: {click_log_file}")
-        
-        # 加载数据
-        self.bury_requests = self._load_bury_requests()
-        self.click_logs = self._load_click_logs()
-        
-        print(f"📊 加载埋点请求: {len(self.bury_requests)} 条")
-        print(f"🖱️ 加载点击日志: {len(self.click_logs)} 条")
-    
-    def _find_latest_file(self, prefix: str) -> str:
-        """查找最新文件"""
-        files = [os.path.join("log", f) for f in os.listdir("log") 
-                if f.startswith(prefix) and f.endswith(".jsonl")]
-        if not files:
-            raise FileNotFoundError(f"❌ 未找到 {prefix}*.jsonl 文件")
-        latest = sorted(files)[-1]
-        return latest
-    
-    def _load_bury_requests(self) -> List[Dict]:
-        """加载埋点请求（只保留埋点域名的数据）"""
-        data = []
-        
-        with open(self.mitm_file, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
 
-                    # 1️⃣ 域名过滤
-                    if self.BURY_POINT_DOMAIN not in obj.get("host", ""):
-                        continue
+# 点击元素取 label（缺失时为 unknown）
+_get_label = methodcaller("get", "label", "unknown")
 
-                    # 2️⃣ 只保留 POST（过滤 OPTIONS）
-                    if obj.get("method") != "POST":
-                        continue
 
-                    # 3️⃣ body 必须存在
-                    body = obj.get("body")
-                    if not body:
-                        continue
+class Match(NamedTuple):
+    """一次有效点击与其归因埋点的匹配记录"""
+    click: Dict
+    bury_request: Dict
+    events: List[Dict]
+    time_diff_ms: int
+    event_count: int
+    attribution_window: Tuple[int, int]
 
-                    # 解析成功，添加到结果
-                    data.append(obj)
 
-                except Exception as e:
-                    print(f"⚠️ JSON解析失败: {e}")
-        
-        return data
-    
-    def _load_click_logs(self) -> List[Dict]:
-        """加载点击日志"""
-        if not os.path.exists(self.click_log_file):
-            print(f"⚠️ 点击日志文件不存在: {self.click_log_file}")
-            return []
+# 报告头部：纯静态的样式部分，原样写入文件
+_REPORT_HEAD = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>埋点分析报告 - 增强版</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+        }
+        .container {
+            max-width: 1600px;
+            margin: 0 auto;
+            background: white;
+            border-radius: 15px;
+            box-shadow: 0 10px 40px rgba(0,0,0,0.2);
+            overflow: hidden;
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 50px 40px;
+            text-align: center;
+        }
+        .header h1 {
+            font-size: 2.8em;
+            margin-bottom: 15px;
+        }
+        .content { padding: 40px; }
         
-        data = []
-        with open(self.click_log_file, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data.append(json.loads(line))
-                except Exception as e:
-                    print(f"⚠️ JSON解析失败: {e}")
+        .score-card {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 40px;
+            border-radius: 15px;
+            margin: 30px 0;
+            box-shadow: 0 5px 20px rgba(102, 126, 234, 0.3);
+        }
+        .score-card h3 {
+            font-size: 2em;
+            margin-bottom: 20px;
+        }
+        .score-bar {
+            background: rgba(255,255,255,0.2);
+            height: 45px;
+            border-radius: 25px;
+            overflow: hidden;
+            margin: 20px 0;
+        }
+        .score-fill {
+            background: white;
+            height: 100%;
+            transition: width 1.5s ease;
+            display: flex;
+            align-items: center;
+            justify-content: flex-end;
+            padding-right: 20px;
+            color: #667eea;
+            font-weight: bold;
+            font-size: 1.4em;
+        }
+        .score-details {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 15px;
+            margin-top: 25px;
+        }
+        .score-item {
+            background: rgba(255,255,255,0.1);
+            padding: 15px;
+            border-radius: 10px;
+        }
+        .score-item-label {
+            font-size: 0.9em;
+            opacity: 0.9;
+        }
+        .score-item-value {
+            font-size: 1.5em;
+            font-weight: bold;
+            margin-top: 5px;
+        }
         
-        return data
-    
-    def get_valid_clicks(self) -> List[Dict]:
-        """获取有效点击（通过click_validation的点击）"""
-        valid_clicks = []
+        .coverage-summary {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(220px, 1fr));
+            gap: 20px;
+            margin: 30px 0;
+        }
+        .coverage-card {
+            background: #f8f9fa;
+            padding: 30px;
+            border-radius: 12px;
+            text-align: center;
+            border-left: 5px solid #667eea;
+            transition: transform 0.3s ease, box-shadow 0.3s ease;
+        }
+        .coverage-card:hover {
+            transform: translateY(-5px);
+            box-shadow: 0 8px 20px rgba(0,0,0,0.15);
+        }
+        .coverage-value {
+            font-size: 3.2em;
+            font-weight: bold;
+            background: linear-gradient(135deg, #667eea, #764ba2);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            margin: 10px 0;
+        }
+        .coverage-label {
+            color: #718096;
+            font-size: 1.1em;
+            font-weight: 500;
+        }
         
-        for click in self.click_logs:
-            validation = click.get("click_validation", {})
-            
-            # 判断是否为有效点击：
-            # 1. 页面发生变化 或
-            # 2. 有业务请求 或
-            # 3. 有埋点请求
-            is_valid = (
-                validation.get("page_changed", False) or
-                validation.get("has_business_request", False) or
-                validation.get("has_burying_request", False)
-            )
-            
-            if is_valid:
-                valid_clicks.append(click)
+        .section {
+            margin: 50px 0;
+        }
+        .section h2 {
+            color: #2d3748;
+            margin-bottom: 25px;
+            padding-bottom: 15px;
+            border-bottom: 3px solid #667eea;
+            font-size: 2em;
+        }
         
-        return valid_clicks
-    
-    def extract_events(self, body, path="", url="") -> List[Dict]:
-        """深度提取所有埋点事件"""
-        events = []
+        table {
+            width: 100%;
+            border-collapse: collapse;
+            margin: 20px 0;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+            font-size: 0.95em;
+        }
+        th, td {
+            padding: 15px;
+            text-align: left;
+            border-bottom: 1px solid #e2e8f0;
+        }
+        th {
+            background: linear-gradient(135deg, #667eea, #764ba2);
+            color: white;
+            font-weight: 600;
+            text-transform: uppercase;
+            font-size: 0.85em;
+            letter-spacing: 0.5px;
+        }
+        tr:hover { 
+            background: #f7fafc;
+            transition: background 0.2s ease;
+        }
         
-        if isinstance(body, dict):
-            # 直接包含event字段
-            if "event" in body:
-                event_name = body.get("event", "unknown")
-                params = {}
-                
-                # 解析params
-                params_raw = body.get("params", {})
-                if isinstance(params_raw, str):
-                    try:
-                        params = json.loads(params_raw)
-                    except:
-                        params = {"_raw": params_raw}
-                elif isinstance(params_raw, dict):
-                    params = params_raw
-                
-                events.append({
-                    "event": event_name,
-                    "params": params,
-                    "path": path,
-                    "local_time_ms": body.get("local_time_ms"),
-                    "session_id": body.get("session_id")
-                })
-            
-            # 特殊处理：/webid 路径的埋点（设备标识请求）
-            elif "/webid" in url and "user_unique_id" in body:
-                events.append({
-                    "event": "device_id_request",
-                    "params": {
-                        "app_id": body.get("app_id", ""),
-                        "url": body.get("url", "")
-                    },
-                    "path": path,
-                    "local_time_ms": None,
-                    "session_id": None
-                })
-            
-            # 递归查找嵌套结构
-            for key, value in body.items():
-                events.extend(self.extract_events(value, f"{path}.{key}" if path else key, url))
+        code {
+            background: #edf2f7;
+            padding: 4px 8px;
+            border-radius: 4px;
+            font-family: 'Courier New', monospace;
+            font-size: 0.9em;
+            color: #667eea;
+        }
         
-        elif isinstance(body, list):
-            for idx, item in enumerate(body):
-                events.extend(self.extract_events(item, f"{path}[{idx}]", url))
+        .alert {
+            padding: 20px;
+            border-radius: 10px;
+            margin: 20px 0;
+            font-size: 1.05em;
+        }
+        .alert-warning {
+            background: #fff3cd;
+            border-left: 5px solid #ffc107;
+            color: #856404;
+        }
+        .alert-success {
+            background: #d4edda;
+            border-left: 5px solid #28a745;
+            color: #155724;
+        }
+        .alert-info {
+            background: #d1ecf1;
+            border-left: 5px solid #17a2b8;
+            color: #0c5460;
+        }
         
-        return events
-    
-    def analyze_coverage(self) -> Dict:
-        """
-        基于【相邻有效点击边界】的埋点归因模型
-        归因区间：[click_i, click_{i+1})
-        """
-        # 1️⃣ 获取有效点击
-        valid_clicks = self.get_valid_clicks()
-
-        print(f"\n🔍 分析覆盖率（相邻点击归因模型）...")
-        print(f"   有效点击: {len(valid_clicks)}")
-        print(f"   无效点击: {len(self.click_logs) - len(valid_clicks)}")
-
-        if not valid_clicks:
-            return {}
-
-        # 2️⃣ 按时间排序
-        valid_clicks_sorted = sorted(valid_clicks, key=lambda x: x.get("timestamp_ms", 0))
-        bury_requests_sorted = sorted(self.bury_requests, key=lambda x: x.get("timestamp", 0))
-
-        matched = []
-        unmatched_clicks = []
-        used_bury_indices = set()
-
-        # 统计时间分布
-        time_diff_distribution = {
-            "0-1s": 0,
-            "1-3s": 0,
-            "3-5s": 0,
-            "5-10s": 0,
-            "10s+": 0
+        .recommendation {
+            background: #f8f9fa;
+            padding: 30px;
+            border-radius: 12px;
+            margin: 25px 0;
+            border-left: 5px solid #667eea;
         }
-
-        # 3️⃣ 核心归因逻辑：相邻点击切分
-        for i, click in enumerate(valid_clicks_sorted):
-            click_time = click.get("timestamp_ms", 0)
-
-            # 当前点击的归因区间结束时间
-            if i + 1 < len(valid_clicks_sorted):
-                next_click_time = valid_clicks_sorted[i + 1].get("timestamp_ms", 0)
-            else:
-                # 最后一次点击兜底（防止无限吞埋点）
-                next_click_time = click_time + self.TIME_WINDOW_MS
-
-            found = False
-
-            for idx, bury in enumerate(bury_requests_sorted):
-                if idx in used_bury_indices:
-                    continue
-
-                bury_time = bury.get("timestamp", 0)
-
-                # 🎯 核心判断：是否落在当前点击区间
-                if click_time <= bury_time < next_click_time:
-                    time_diff = bury_time - click_time
-
-                    # 提取事件
-                    events = self.extract_events(
-                        bury.get("body", {}),
-                        "",
-                        bury.get("url", "")
-                    )
-
-                    # 时间分布统计
-                    if time_diff < 1000:
-                        time_diff_distribution["0-1s"] += 1
-                    elif time_diff < 3000:
-                        time_diff_distribution["1-3s"] += 1
-                    elif time_diff < 5000:
-                        time_diff_distribution["3-5s"] += 1
-                    elif time_diff < 10000:
-                        time_diff_distribution["5-10s"] += 1
-                    else:
-                        time_diff_distribution["10s+"] += 1
-
-                    matched.append({
-                        "click": click,
-                        "bury_request": bury,
-                        "events": events,
-                        "time_diff_ms": time_diff,
-                        "event_count": len(events),
-                        "attribution_window": [click_time, next_click_time]
-                    })
-
-                    used_bury_indices.add(idx)
-                    found = True
-                    break
-
-            if not found:
-                unmatched_clicks.append(click)
-
-        # 4️⃣ 覆盖率计算
-        total_valid_clicks = len(valid_clicks_sorted)
-        covered_clicks = len(matched)
-        uncovered_clicks = len(unmatched_clicks)
-        coverage_rate = (
-            covered_clicks / total_valid_clicks * 100
-            if total_valid_clicks > 0 else 0
-        )
-
-        print(f"   覆盖率: {coverage_rate:.1f}%")
-
-        # 5️⃣ 未覆盖分析
-        unmatched_pages = Counter(
-            c.get("after_activity", "unknown") for c in unmatched_clicks
-        )
-        unmatched_elements = Counter(
-            c.get("element", {}).get("label", "unknown")
-            for c in unmatched_clicks
-        )
-
-        # 6️⃣ 无效点击分析
-        invalid_clicks = [c for c in self.click_logs if c not in valid_clicks]
-        invalid_reasons = Counter(
-            c.get("click_validation", {}).get("reason", "unknown")
-            for c in invalid_clicks
-        )
-
-        return {
-            "total_valid_clicks": total_valid_clicks,
-            "total_invalid_clicks": len(invalid_clicks),
-            "covered_clicks": covered_clicks,
-            "uncovered_clicks": uncovered_clicks,
-            "coverage_rate": coverage_rate,
-            "matched_pairs": matched,
-            "unmatched_clicks": unmatched_clicks,
-            "unmatched_pages": dict(unmatched_pages.most_common(10)),
-            "unmatched_elements": dict(unmatched_elements.most_common(20)),
-            "invalid_reasons": dict(invalid_reasons.most_common(10)),
-            "time_diff_distribution": time_diff_distribution
+        .recommendation h3 {
+            color: #667eea;
+            margin-bottom: 20px;
+            font-size: 1.5em;
         }
-    
-    def build_trigger_latency_from_coverage(self, coverage: Dict) -> Dict:
-        trigger_latency = {
-            "即时(<500ms)": 0,
-            "快速(500ms-2s)": 0,
-            "正常(2s-5s)": 0,
-            "延迟(5s-10s)": 0,
-            "很慢(>10s)": 0
+        .recommendation ul {
+            list-style: none;
         }
-
-        for pair in coverage.get("matched_pairs", []):
-            gap = pair.get("time_diff_ms", 0)
-
-            if gap < 500:
-                trigger_latency["即时(<500ms)"] += 1
-            elif gap < 2000:
-                trigger_latency["快速(500ms-2s)"] += 1
-            elif gap < 5000:
-                trigger_latency["正常(2s-5s)"] += 1
-            elif gap < 10000:
-                trigger_latency["延迟(5s-10s)"] += 1
-            else:
-                trigger_latency["很慢(>10s)"] += 1
-
-        return trigger_latency
-
-    def analyze_events(self) -> Dict:
-        """深度事件分析"""
-        print(f"\n🔍 分析事件...")
-        
-        all_events = []
-        
-        # 从所有埋点请求中提取事件
-        for bury in self.bury_requests:
-            events = self.extract_events(bury.get("body", {}), "", bury.get("url", ""))
-            for evt in events:
-                evt["timestamp"] = bury.get("timestamp")
-                evt["action_gap_ms"] = bury.get("action_gap_ms", 0)
-                all_events.append(evt)
-        
-        # 事件统计
-        event_counts = Counter(evt["event"] for evt in all_events)
-        
-        # 事件参数统计
-        event_params = defaultdict(lambda: defaultdict(set))
-        for evt in all_events:
-            for param_key, param_value in evt["params"].items():
-                # 截断过长的值
-                value_str = str(param_value)[:100]
-                event_params[evt["event"]][param_key].add(value_str)
-        
-        # 响应时间分析
-        trigger_latency = self.build_trigger_latency_from_coverage(
-            self.analyze_coverage()
-        )
-        
-        print(f"   事件总数: {len(all_events)}")
-        print(f"   事件类型: {len(event_counts)}")
-        
-        return {
-            "total_events": len(all_events),
-            "unique_event_types": len(event_counts),
-            "event_counts": event_counts,
-            "event_params": {
-                event: {
-                    param: list(values)[:10]  # 每个参数显示最多10个不同值
-                    for param, values in params.items()
-                }
-                for event, params in event_params.items()
-            },
-            "trigger_latency": trigger_latency,
-            "all_events": all_events
+        .recommendation li {
+            padding: 12px 0;
+            padding-left: 35px;
+            position: relative;
+            line-height: 1.6;
         }
-    
-    def analyze_attributes(self, event_analysis: Dict) -> Dict:
-        """属性深度分析"""
-        print(f"\n🔍 分析属性...")
-        
-        # 统计每个事件的参数完整度
-        event_param_stats = {}
-        
-        for event, params in event_analysis["event_params"].items():
-            param_count = len(params)
-            param_value_counts = {
-                param: len(values) 
-                for param, values in params.items()
-            }
-            
-            event_param_stats[event] = {
-                "param_count": param_count,
-                "param_names": list(params.keys()),
-                "param_diversity": param_value_counts
-            }
-        
-        # 找出参数最丰富和最贫瘠的事件
-        events_by_param_count = sorted(
-            event_param_stats.items(),
-            key=lambda x: x[1]["param_count"],
-            reverse=True
-        )
-        
-        # 分析常见参数
-        all_param_names = []
-        for event_stat in event_param_stats.values():
-            all_param_names.extend(event_stat["param_names"])
-        
-        common_params = Counter(all_param_names).most_common(20)
-        
-        return {
-            "event_param_stats": event_param_stats,
-            "richest_events": events_by_param_count[:10],
-            "poorest_events": events_by_param_count[-10:],
-            "common_params": dict(common_params)
+        .recommendation li:before {
+            content: "💡";
+            position: absolute;
+            left: 0;
+            font-size: 1.3em;
         }
-    
-    def calculate_quality_score(self, coverage: Dict, event_analysis: Dict, attr_analysis: Dict) -> Dict:
-        """计算埋点质量评分"""
-        score = {}
-        
-        # 1. 覆盖率 (40分)
-        score["覆盖率"] = int(coverage["coverage_rate"] * 0.4)
-        
-        # 2. 事件丰富度 (25分)
-        event_types = event_analysis["unique_event_types"]
-        score["事件丰富度"] = min(25, event_types * 2)
-        
-        # 3. 响应及时性 (20分)
-        latency = event_analysis["trigger_latency"]
-        total_events = sum(latency.values())
-        if total_events > 0:
-            fast_ratio = (latency["即时(<500ms)"] + latency["快速(500ms-2s)"]) / total_events
-            score["响应及时性"] = int(fast_ratio * 20)
-        else:
-            score["响应及时性"] = 0
-        
-        # 4. 参数完整度 (15分)
-        if len(attr_analysis["event_param_stats"]) > 0:
-            avg_params = sum(
-                stat["param_count"] 
-                for stat in attr_analysis["event_param_stats"].values()
-            ) / len(attr_analysis["event_param_stats"])
-            score["参数完整度"] = min(15, int(avg_params * 1.5))
-        else:
-            score["参数完整度"] = 0
-        
-        score["总分"] = sum(score.values())
-        
-        # 评级
-        total = score["总分"]
-        if total >= 90:
-            score["评级"] = "A+ 优秀"
-        elif total >= 80:
-            score["评级"] = "A 良好"
-        elif total >= 70:
-            score["评级"] = "B 中等"
-        elif total >= 60:
-            score["评级"] = "C 及格"
-        else:
-            score["评级"] = "D 需改进"
-        
-        return score
-    
-    def generate_report(self, output=None):
-        """生成详细报告"""
-        print("\n" + "="*60)
-        print("🚀 开始分析...")
-        print("="*60)
-        
-        # 分析
-        coverage = self.analyze_coverage()
-        event_analysis = self.analyze_events()
-        attr_analysis = self.analyze_attributes(event_analysis)
-        quality_score = self.calculate_quality_score(coverage, event_analysis, attr_analysis)
-        
-        # 自动生成带时间戳的文件名
-        if not output:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output = f"埋点分析报告_{timestamp}.html"
-        
-        # 生成 HTML
-        html = self._generate_html(coverage, event_analysis, attr_analysis, quality_score)
-        
-        with open(output, "w", encoding="utf-8") as f:
-            f.write(html)
         
-        print("\n" + "="*60)
-        print(f"✅ 报告已生成: {output}")
-        print(f"📊 有效点击数: {coverage['total_valid_clicks']}")
-        print(f"📊 埋点覆盖率: {coverage['coverage_rate']:.1f}%")
-        print(f"🏆 质量评分: {quality_score['总分']}/100 ({quality_score['评级']})")
-        print("="*60)
-        
-        return output
-    
-    def _generate_html(self, coverage: Dict, events: Dict, attrs: Dict, score: Dict) -> str:
-        """生成 HTML 报告"""
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
+            gap: 20px;
+            margin: 25px 0;
+        }
+        .stat-box {
+            background: #f8f9fa;
+            padding: 25px;
+            border-radius: 10px;
+            border-left: 4px solid #667eea;
+        }
+        .stat-box h4 {
+            color: #667eea;
+            margin-bottom: 15px;
+            font-size: 1.2em;
+        }
+        .stat-box .value {
+            font-size: 2.5em;
+            font-weight: bold;
+            color: #2d3748;
+        }
+    </style>
+</head>
+"""
+
+# 报告正文模板：模块加载时编译一次
+_REPORT_TMPL = Template("""<body>
+    <div class="container">
+        <div class="header">
+            <h1>📊 埋点分析报告</h1>
+            <p style="font-size: 1.3em; margin-top: 15px;">生成时间: ${generated_at}</p>
+            <p style="margin-top: 10px;">埋点域名: <code style="background: rgba(255,255,255,0.2); color: white; padding: 8px 15px; border-radius: 5px; font-size: 1.1em;">${bury_point_domain}</code></p>
+            <!---
+            <p style="margin-top: 5px; font-size: 0.95em; opacity: 0.9;">时间窗口: ${time_window_ms}ms</p>
+            --->
+        </div>
         
-        # 事件表格
-        event_html = ""
-        for event, count in list(events["event_counts"].most_common(30)):
-            params = events["event_params"].get(event, {})
-            param_names = list(params.keys())[:8]
-            
-            event_html += f"""
-            <tr>
-                <td><strong>{event}</strong></td>
-                <td>{count}</td>
-                <td>{len(params)}</td>
-                <td><code>{', '.join(param_names) if param_names else '-'}</code></td>
-            </tr>
-            """
-        
-        # 未覆盖点击
-        unmatched_html = ""
-        for click in coverage["unmatched_clicks"][:40]:
-            element = click.get("element", {})
-            unmatched_html += f"""
-            <tr>
-                <td>{click.get('after_activity', 'unknown')}</td>
-                <td>{element.get('label', 'unknown')[:60]}</td>
-                <td>{element.get('class', 'unknown')}</td>
-                <td>{datetime.fromtimestamp(click.get('timestamp_ms', 0)/1000).strftime('%H:%M:%S')}</td>
-            </tr>
-            """
-        
-        if not unmatched_html:
-            unmatched_html = "<tr><td colspan='4' style='text-align:center;color:#999;'>暂无数据</td></tr>"
-        
-        # 匹配对
-        matched_html = ""
-        for pair in coverage["matched_pairs"][:40]:
-            click = pair["click"]
-            element = click.get("element", {})
-            events_list = pair["events"]
-            event_names = [e.get("event", "unknown") for e in events_list]
-            
-            matched_html += f"""
-            <tr>
-                <td>{element.get('label', 'unknown')[:40]}</td>
-                <td><code>{', '.join(event_names[:3])}</code></td>
-                <td>{pair['event_count']}</td>
-                <td>{pair['time_diff_ms']} ms</td>
-            </tr>
-            """
-        
-        if not matched_html:
-            matched_html = "<tr><td colspan='4' style='text-align:center;color:#999;'>暂无数据</td></tr>"
-        
-        # 未覆盖页面统计
-        page_stats_html = ""
-        for page, count in coverage["unmatched_pages"].items():
-            page_stats_html += f"""
-            <tr>
-                <td><code>{page}</code></td>
-                <td>{count}</td>
-                <td>{count / max(coverage['total_valid_clicks'], 1) * 100:.1f}%</td>
-            </tr>
-            """
-        
-        if not page_stats_html:
-            page_stats_html = "<tr><td colspan='3' style='text-align:center;color:#999;'>暂无数据</td></tr>"
-        
-        # 参数丰富度分析
-        param_rich_html = ""
-        for event, stat in list(attrs["richest_events"])[:15]:
-            param_rich_html += f"""
-            <tr>
-                <td><strong>{event}</strong></td>
-                <td>{stat['param_count']}</td>
-                <td><code>{', '.join(stat['param_names'][:6])}</code></td>
-            </tr>
-            """
-        
-        # 常见参数
-        common_params_html = ""
-        for param, count in list(attrs["common_params"].items())[:20]:
-            common_params_html += f"""
-            <tr>
-                <td><code>{param}</code></td>
-                <td>{count}</td>
-            </tr>
-            """
-        
-        # 无效点击原因
-        invalid_reasons_html = ""
-        if coverage["invalid_reasons"]:
-            for reason, count in coverage["invalid_reasons"].items():
-                invalid_reasons_html += f"""
-                <tr>
-                    <td>{reason}</td>
-                    <td>{count}</td>
-                    <td>{count / max(coverage['total_invalid_clicks'], 1) * 100:.1f}%</td>
-                </tr>
-                """
-        else:
-            invalid_reasons_html = "<tr><td colspan='3' style='text-align:center;color:#999;'>暂无数据</td></tr>"
-        
-        return f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <title>埋点分析报告 - 增强版</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: 'Segoe UI', -apple-system, BlinkMacSystemFont, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 20px;
-        }}
-        .container {{
-            max-width: 1600px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 15px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-            overflow: hidden;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 50px 40px;
-            text-align: center;
-        }}
-        .header h1 {{
-            font-size: 2.8em;
-            margin-bottom: 15px;
-        }}
-        .content {{ padding: 40px; }}
-        
-        .score-card {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 40px;
-            border-radius: 15px;
-            margin: 30px 0;
-            box-shadow: 0 5px 20px rgba(102, 126, 234, 0.3);
-        }}
-        .score-card h3 {{
-            font-size: 2em;
-            margin-bottom: 20px;
-        }}
-        .score-bar {{
-            background: rgba(255,255,255,0.2);
-            height: 45px;
-            border-radius: 25px;
-            overflow: hidden;
-            margin: 20px 0;
-        }}
-        .score-fill {{
-            background: white;
-            height: 100%;
-            transition: width 1.5s ease;
-            display: flex;
-            align-items: center;
-            justify-content: flex-end;
-            padding-right: 20px;
-            color: #667eea;
-            font-weight: bold;
-            font-size: 1.4em;
-        }}
-        .score-details {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-top: 25px;
-        }}
-        .score-item {{
-            background: rgba(255,255,255,0.1);
-            padding: 15px;
-            border-radius: 10px;
-        }}
-        .score-item-label {{
-            font-size: 0.9em;
-            opacity: 0.9;
-        }}
-        .score-item-value {{
-            font-size: 1.5em;
-            font-weight: bold;
-            margin-top: 5px;
-        }}
-        
-        .coverage-summary {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(220px, 1fr));
-            gap: 20px;
-            margin: 30px 0;
-        }}
-        .coverage-card {{
-            background: #f8f9fa;
-            padding: 30px;
-            border-radius: 12px;
-            text-align: center;
-            border-left: 5px solid #667eea;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }}
-        .coverage-card:hover {{
-            transform: translateY(-5px);
-            box-shadow: 0 8px 20px rgba(0,0,0,0.15);
-        }}
-        .coverage-value {{
-            font-size: 3.2em;
-            font-weight: bold;
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            margin: 10px 0;
-        }}
-        .coverage-label {{
-            color: #718096;
-            font-size: 1.1em;
-            font-weight: 500;
-        }}
-        
-        .section {{
-            margin: 50px 0;
-        }}
-        .section h2 {{
-            color: #2d3748;
-            margin-bottom: 25px;
-            padding-bottom: 15px;
-            border-bottom: 3px solid #667eea;
-            font-size: 2em;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 20px 0;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
-            font-size: 0.95em;
-        }}
-        th, td {{
-            padding: 15px;
-            text-align: left;
-            border-bottom: 1px solid #e2e8f0;
-        }}
-        th {{
-            background: linear-gradient(135deg, #667eea, #764ba2);
-            color: white;
-            font-weight: 600;
-            text-transform: uppercase;
-            font-size: 0.85em;
-            letter-spacing: 0.5px;
-        }}
-        tr:hover {{ 
-            background: #f7fafc;
-            transition: background 0.2s ease;
-        }}
-        
-        code {{
-            background: #edf2f7;
-            padding: 4px 8px;
-            border-radius: 4px;
-            font-family: 'Courier New', monospace;
-            font-size: 0.9em;
-            color: #667eea;
-        }}
-        
-        .alert {{
-            padding: 20px;
-            border-radius: 10px;
-            margin: 20px 0;
-            font-size: 1.05em;
-        }}
-        .alert-warning {{
-            background: #fff3cd;
-            border-left: 5px solid #ffc107;
-            color: #856404;
-        }}
-        .alert-success {{
-            background: #d4edda;
-            border-left: 5px solid #28a745;
-            color: #155724;
-        }}
-        .alert-info {{
-            background: #d1ecf1;
-            border-left: 5px solid #17a2b8;
-            color: #0c5460;
-        }}
-        
-        .recommendation {{
-            background: #f8f9fa;
-            padding: 30px;
-            border-radius: 12px;
-            margin: 25px 0;
-            border-left: 5px solid #667eea;
-        }}
-        .recommendation h3 {{
-            color: #667eea;
-            margin-bottom: 20px;
-            font-size: 1.5em;
-        }}
-        .recommendation ul {{
-            list-style: none;
-        }}
-        .recommendation li {{
-            padding: 12px 0;
-            padding-left: 35px;
-            position: relative;
-            line-height: 1.6;
-        }}
-        .recommendation li:before {{
-            content: "💡";
-            position: absolute;
-            left: 0;
-            font-size: 1.3em;
-        }}
-        
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-            gap: 20px;
-            margin: 25px 0;
-        }}
-        .stat-box {{
-            background: #f8f9fa;
-            padding: 25px;
-            border-radius: 10px;
-            border-left: 4px solid #667eea;
-        }}
-        .stat-box h4 {{
-            color: #667eea;
-            margin-bottom: 15px;
-            font-size: 1.2em;
-        }}
-        .stat-box .value {{
-            font-size: 2.5em;
-            font-weight: bold;
-            color: #2d3748;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📊 埋点分析报告</h1>
-            <p style="font-size: 1.3em; margin-top: 15px;">生成时间: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-            <p style="margin-top: 10px;">埋点域名: <code style="background: rgba(255,255,255,0.2); color: white; padding: 8px 15px; border-radius: 5px; font-size: 1.1em;">{self.BURY_POINT_DOMAIN}</code></p>
-            <!---
-            <p style="margin-top: 5px; font-size: 0.95em; opacity: 0.9;">时间窗口: {self.TIME_WINDOW_MS}ms</p>
-            --->
-        </div>
-        
-        <div class="content">
-            <!-- 质量评分 -->
-            <div class="score-card">
-                <h3>🏆 埋点质量总评: {score['总分']}/100 - {score['评级']}</h3>
-                <div class="score-bar">
-                    <div class="score-fill" style="width: {score['总分']}%">{score['总分']}</div>
-                </div>
-                <div class="score-details">
-                    <div class="score-item">
-                        <div class="score-item-label">覆盖率</div>
-                        <div class="score-item-value">{score['覆盖率']}/40</div>
-                    </div>
-                    <div class="score-item">
-                        <div class="score-item-label">事件丰富度</div>
-                        <div class="score-item-value">{score['事件丰富度']}/25</div>
-                    </div>
-                    <div class="score-item">
-                        <div class="score-item-label">响应及时性</div>
-                        <div class="score-item-value">{score['响应及时性']}/20</div>
-                    </div>
-                    <div class="score-item">
-                        <div class="score-item-label">参数完整度</div>
-                        <div class="score-item-value">{score['参数完整度']}/15</div>
-                    </div>
-                </div>
-            </div>
+        <div class="content">
+            <!-- 质量评分 -->
+            <div class="score-card">
+                <h3>🏆 埋点质量总评: ${score_total}/100 - ${score_grade}</h3>
+                <div class="score-bar">
+                    <div class="score-fill" style="width: ${score_total}%">${score_total}</div>
+                </div>
+                <div class="score-details">
+                    <div class="score-item">
+                        <div class="score-item-label">覆盖率</div>
+                        <div class="score-item-value">${score_coverage}/40</div>
+                    </div>
+                    <div class="score-item">
+                        <div class="score-item-label">事件丰富度</div>
+                        <div class="score-item-value">${score_richness}/25</div>
+                    </div>
+                    <div class="score-item">
+                        <div class="score-item-label">响应及时性</div>
+                        <div class="score-item-value">${score_timeliness}/20</div>
+                    </div>
+                    <div class="score-item">
+                        <div class="score-item-label">参数完整度</div>
+                        <div class="score-item-value">${score_completeness}/15</div>
+                    </div>
+                </div>
+            </div>
             
             <!-- 覆盖率摘要 -->
             <div class="coverage-summary">
                 <div class="coverage-card">
                     <div class="coverage-label">有效点击数</div>
-                    <div class="coverage-value">{coverage['total_valid_clicks']}</div>
+                    <div class="coverage-value">${total_valid_clicks}</div>
                 </div>
                 <div class="coverage-card">
                     <div class="coverage-label">已覆盖点击</div>
-                    <div class="coverage-value" style="-webkit-text-fill-color: #28a745;">{coverage['covered_clicks']}</div>
+                    <div class="coverage-value" style="-webkit-text-fill-color: #28a745;">${covered_clicks}</div>
                 </div>
                 <div class="coverage-card">
                     <div class="coverage-label">未覆盖点击</div>
-                    <div class="coverage-value" style="-webkit-text-fill-color: #dc3545;">{coverage['uncovered_clicks']}</div>
+                    <div class="coverage-value" style="-webkit-text-fill-color: #dc3545;">${uncovered_clicks}</div>
                 </div>
                 <div class="coverage-card">
                     <div class="coverage-label">覆盖率</div>
-                    <div class="coverage-value">{coverage['coverage_rate']:.1f}%</div>
+                    <div class="coverage-value">${coverage_rate}%</div>
                 </div>
             </div>
             
@@ -910,19 +341,19 @@ class BuryPointAnalyzer:
                 <strong>📌 数据说明</strong><br>
                 • 有效点击：通过click_validation验证的点击（页面变化/触发业务请求）<br>
                 <!--
-                • 无效点击：{coverage['total_invalid_clicks']} 次（未通过验证的点击）<br>
+                • 无效点击：${total_invalid_clicks} 次（未通过验证的点击）<br>
                 -->
                 • 覆盖率计算：以「有效点击」作为分母。
                             对每一次有效点击，构建其独立的埋点归因时间区间：
-                            从该次点击发生时间开始，到下一次有效点击发生时间为止（不超过 {self.TIME_WINDOW_MS} ms 的最大上限）。
+                            从该次点击发生时间开始，到下一次有效点击发生时间为止（不超过 ${time_window_ms} ms 的最大上限）。
                             在该区间内出现的埋点请求将被归因至该次点击，且每一条埋点请求仅允许归因给一次点击。
                             若某次有效点击在其归因区间内未匹配到任何埋点请求，则视为无埋点覆盖。<br>
                 • 响应时间定义：从用户有效点击发生，到该点击归因区间内首个埋点请求发出的时间差。<br>
-                • 响应时间分布：0-1s ({coverage['time_diff_distribution']['0-1s']}), 1-3s ({coverage['time_diff_distribution']['1-3s']}), 3-5s ({coverage['time_diff_distribution']['3-5s']}), 5-10s ({coverage['time_diff_distribution']['5-10s']})
+                • 响应时间分布：0-1s (${diff_0_1s}), 1-3s (${diff_1_3s}), 3-5s (${diff_3_5s}), 5-10s (${diff_5_10s})
             </div>
             
             <!-- 警告信息 -->
-            {'<div class="alert alert-warning"><strong>⚠️ 覆盖率偏低</strong><br>建议补充缺失的埋点事件，重点关注高频未覆盖页面</div>' if coverage['coverage_rate'] < 60 else '<div class="alert alert-success"><strong>✅ 覆盖率良好</strong><br>埋点设置较为完善，继续保持</div>'}
+            ${coverage_alert_html}
             
             <!-- 事件统计 -->
             <div class="section">
@@ -930,11 +361,11 @@ class BuryPointAnalyzer:
                 <div class="stats-grid">
                     <div class="stat-box">
                         <h4>总事件数</h4>
-                        <div class="value">{events['total_events']}</div>
+                        <div class="value">${total_events}</div>
                     </div>
                     <div class="stat-box">
                         <h4>事件类型数</h4>
-                        <div class="value">{events['unique_event_types']}</div>
+                        <div class="value">${unique_event_types}</div>
                     </div>
                 </div>
                 <table>
@@ -947,7 +378,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {event_html}
+                        ${event_html}
                     </tbody>
                 </table>
             </div>
@@ -965,7 +396,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {matched_html}
+                        ${matched_html}
                     </tbody>
                 </table>
             </div>
@@ -983,7 +414,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {unmatched_html}
+                        ${unmatched_html}
                     </tbody>
                 </table>
             </div>
@@ -1000,7 +431,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {page_stats_html}
+                        ${page_stats_html}
                     </tbody>
                 </table>
             </div>
@@ -1017,7 +448,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {param_rich_html}
+                        ${param_rich_html}
                     </tbody>
                 </table>
             </div>
@@ -1033,7 +464,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {common_params_html}
+                        ${common_params_html}
                     </tbody>
                 </table>
             </div>
@@ -1050,10 +481,7 @@ class BuryPointAnalyzer:
                         </tr>
                     </thead>
                     <tbody>
-                        {''.join(
-                            f"<tr><td>{label}</td><td>{count}</td><td>{count/max(sum(events['trigger_latency'].values()),1)*100:.1f}%</td></tr>"
-                            for label, count in events['trigger_latency'].items()
-                        )}
+                        ${latency_html}
                     </tbody>
                 </table>
             </div>
@@ -1062,18 +490,749 @@ class BuryPointAnalyzer:
             <div class="recommendation">
                 <h3>💡 优化建议</h3>
                 <ul>
-                    {'<li><strong>紧急</strong>：覆盖率低于60%，建议立即补充埋点</li>' if coverage['coverage_rate'] < 60 else ''}
-                    {'<li>优先为高频未覆盖页面补充埋点：' + ', '.join(list(coverage['unmatched_pages'].keys())[:3]) + '</li>' if coverage['uncovered_clicks'] > 0 else ''}
-                    {'<li>检查时间差较大的匹配对（>5000ms），优化埋点触发时机</li>' if any(p['time_diff_ms'] > 5000 for p in coverage['matched_pairs'][:20]) else ''}
-                    {'<li>补充事件参数，提高数据分析维度（当前平均参数数：' + f"{sum(s['param_count'] for s in attrs['event_param_stats'].values()) / max(len(attrs['event_param_stats']), 1):.1f}" + '）</li>' if score['参数完整度'] < 12 else '<li>参数定义完整，继续保持</li>'}
-                    {'<li>优化埋点响应速度，减少延迟（当前延迟占比：' + f"{(events['trigger_latency']['延迟(5s-10s)'] + events['trigger_latency']['很慢(>10s)']) / max(sum(events['trigger_latency'].values()), 1) * 100:.1f}%" + '%）</li>' if score['响应及时性'] < 15 else '<li>响应速度良好</li>'}
+                    ${rec_urgent_html}
+                    ${rec_pages_html}
+                    ${rec_time_diff_html}
+                    ${rec_params_html}
+                    ${rec_latency_html}
                     <li>建议定期检查无效点击原因，优化点击验证逻辑</li>
                     <li>关注参数值的多样性，确保数据质量</li>
-                    {'<li><strong>注意</strong>：当前时间窗口为' + str(self.TIME_WINDOW_MS) + 'ms，如需调整请修改配置</li>' if self.TIME_WINDOW_MS != 3000 else ''}
+                    ${rec_window_html}
                 </ul>
             </div>
         </div>
     </div>
 </body>
 </html>
+""")
+
+
+class BuryPointAnalyzer:
+    """埋点分析器"""
+    
+    # 埋点域名（可配置）
+    BURY_POINT_DOMAIN = "dc.cmicapm.com"
+    
+    # 加载时的字节级预过滤：POST 标记（兼容带/不带空格两种 JSON 分隔符）
+    POST_METHOD_MARKERS = (b'"method": "POST"', b'"method":"POST"')
+    
+    # 时间窗口：点击后多久内的埋点算作匹配（毫秒）
+    TIME_WINDOW_MS = 10000  # 扩大到10秒，适应网络延迟
+    
+    # 每个事件参数最多保留的不同取值数
+    MAX_PARAM_VALUES = 10
+    
+    # 提取事件时不下钻的键（请求头/Cookie/原始串等，不会包含埋点事件）
+    SKIP_KEYS = frozenset({"headers", "cookies", "raw", "_raw", "response_headers", "request_headers"})
+    
+    # 时间差分桶边界（毫秒）：第 i 档为 [边界[i-1], 边界[i])，_histogram 对排序后的时间差用 bisect_left 定位各边界
+    TIME_DIFF_EDGES = (1000, 3000, 5000, 10000)
+    TIME_DIFF_LABELS = ("0-1s", "1-3s", "3-5s", "5-10s", "10s+")
+    LATENCY_EDGES = (500, 2000, 5000, 10000)
+    LATENCY_LABELS = ("即时(<500ms)", "快速(500ms-2s)", "正常(2s-5s)", "延迟(5s-10s)", "很慢(>10s)")
+    
+    def __init__(self, mitm_file: str = None, click_log_file: str = None):
+        """
+        Args:
+            mitm_file: MITM捕获文件 (mitm_requests_*.jsonl)
+            click_log_file: 点击日志文件 (click_log_*.jsonl)
         """
+        # 自动查找最新文件
+        if not mitm_file:
+            mitm_file = self._find_latest_file("mitm_requests_")
+        if not click_log_file:
+            click_log_file = self._find_latest_file("click_log_")
+        
+        self.mitm_file = mitm_file
+        self.click_log_file = click_log_file
+        
+        print(f"📁 使用文件:")
+        print(f"   MITM: {mitm_file}")
+        print(f"   点击日志: {click_log_file}")
+        
+        # 加载数据
+        self.bury_requests = self._load_bury_requests()
+        self.click_logs = self._load_click_logs()
+        
+        # 埋点按时间原地排序一次，并缓存平行的时间戳列表供归因二分使用
+        self.bury_requests.sort(key=lambda x: x.get("timestamp", 0))
+        self._bury_ts = [b.get("timestamp", 0) for b in self.bury_requests]
+        # 每条埋点的事件只提取一次，覆盖率归因与事件统计共用（与 bury_requests 下标对齐）
+        self._bury_events = [
+            self.extract_events(b.get("body", {}), "", b.get("url", ""))
+            for b in self.bury_requests
+        ]
+        
+        print(f"📊 加载埋点请求: {len(self.bury_requests)} 条")
+        print(f"🖱️ 加载点击日志: {len(self.click_logs)} 条")
+    
+    def _find_latest_file(self, prefix: str) -> str:
+        """查找最新文件"""
+        # 单次遍历取修改时间最新的文件，无需整体排序
+        latest = max(Path("log").glob(f"{prefix}*.jsonl"),
+                     key=lambda p: p.stat().st_mtime, default=None)
+        if latest is None:
+            raise FileNotFoundError(f"❌ 未找到 {prefix}*.jsonl 文件")
+        return str(latest)
+    
+    @staticmethod
+    def _read_jsonl_lines(path: str) -> List[bytes]:
+        """一次读入整个 JSONL 文件，在 C 层按行切分，返回非空行的原始 bytes"""
+        with open(path, "rb") as f:
+            return [line for line in f.read().splitlines() if line.strip()]
+    
+    def _parse_jsonl(self, path: str, line_filter=None) -> List:
+        """
+        解析整个 JSONL 文件：全部合法时一次列表推导完成，否则逐行重试并跳过坏行
+        line_filter: 字节级预过滤函数，返回 False 的行直接跳过，不做 JSON 解析
+        """
+        lines = self._read_jsonl_lines(path)
+        if line_filter is not None:
+            lines = [line for line in lines if line_filter(line)]
+        try:
+            return [json_loads(line) for line in lines]
+        except Exception:
+            pass
+        
+        data = []
+        for line in lines:
+            try:
+                data.append(json_loads(line))
+            except Exception as e:
+                print(f"⚠️ JSON解析失败: {e}")
+        return data
+    
+    def _load_bury_requests(self) -> List[Dict]:
+        """加载埋点请求（只保留埋点域名的数据）"""
+        domain = self.BURY_POINT_DOMAIN
+        domain_bytes = domain.encode()
+        post_markers = self.POST_METHOD_MARKERS
+        
+        def may_be_bury_post(line: bytes) -> bool:
+            # 原始行中不含埋点域名或不是 POST 的请求无需解析
+            return domain_bytes in line and (post_markers[0] in line or post_markers[1] in line)
+        
+        return [
+            obj for obj in self._parse_jsonl(self.mitm_file, may_be_bury_post)
+            if isinstance(obj, dict)
+            and domain in (obj.get("host") or "")   # 1️⃣ 域名过滤
+            and obj.get("method") == "POST"         # 2️⃣ 只保留 POST（过滤 OPTIONS）
+            and obj.get("body")                     # 3️⃣ body 必须存在
+        ]
+    
+    def _load_click_logs(self) -> List[Dict]:
+        """加载点击日志"""
+        if not os.path.exists(self.click_log_file):
+            print(f"⚠️ 点击日志文件不存在: {self.click_log_file}")
+            return []
+        
+        return self._parse_jsonl(self.click_log_file)
+    
+    def get_valid_clicks(self) -> List[Dict]:
+        """获取有效点击（通过click_validation的点击）"""
+        return self._partition_clicks()[0]
+    
+    def _partition_clicks(self) -> Tuple[List[Dict], List[Dict]]:
+        """一次遍历把点击日志拆分为 (有效点击, 无效点击)"""
+        valid_clicks = []
+        invalid_clicks = []
+        
+        for click in self.click_logs:
+            validation = click.get("click_validation", {})
+            
+            # 判断是否为有效点击：
+            # 1. 页面发生变化 或
+            # 2. 有业务请求 或
+            # 3. 有埋点请求
+            is_valid = (
+                validation.get("page_changed", False) or
+                validation.get("has_business_request", False) or
+                validation.get("has_burying_request", False)
+            )
+            
+            if is_valid:
+                valid_clicks.append(click)
+            else:
+                invalid_clicks.append(click)
+        
+        return valid_clicks, invalid_clicks
+    
+    def extract_events(self, body, path="", url="") -> List[Dict]:
+        """深度提取所有埋点事件（显式栈迭代，避免逐节点递归调用）"""
+        events = []
+        is_webid = "/webid" in url
+        skip_keys = self.SKIP_KEYS
+        stack = [(body, path)]
+        
+        while stack:
+            node, node_path = stack.pop()
+            
+            if isinstance(node, dict):
+                # 直接包含event字段
+                if "event" in node:
+                    event_name = node.get("event", "unknown")
+                    # 事件名/参数名高度重复，驻留后全程共享同一对象
+                    if isinstance(event_name, str):
+                        event_name = sys.intern(event_name)
+                    params = {}
+                    
+                    # 解析params
+                    params_raw = node.get("params", {})
+                    if isinstance(params_raw, str):
+                        try:
+                            params = json_loads(params_raw)
+                        except:
+                            params = {"_raw": params_raw}
+                    elif isinstance(params_raw, dict):
+                        params = params_raw
+                    if params and isinstance(params, dict):
+                        params = {
+                            (sys.intern(k) if isinstance(k, str) else k): v
+                            for k, v in params.items()
+                        }
+                    
+                    events.append({
+                        "event": event_name,
+                        "params": params,
+                        "path": node_path,
+                        "local_time_ms": node.get("local_time_ms"),
+                        "session_id": node.get("session_id")
+                    })
+                    # 事件节点本身即叶子：其 params 等字段已在上面消费，不再下钻
+                    continue
+                
+                # 特殊处理：/webid 路径的埋点（设备标识请求）
+                elif is_webid and "user_unique_id" in node:
+                    events.append({
+                        "event": "device_id_request",
+                        "params": {
+                            "app_id": node.get("app_id", ""),
+                            "url": node.get("url", "")
+                        },
+                        "path": node_path,
+                        "local_time_ms": None,
+                        "session_id": None
+                    })
+                
+                # 只有容器节点才可能包含事件；逆序入栈以保持原先序遍历顺序
+                children = [
+                    (value, f"{node_path}.{key}" if node_path else key)
+                    for key, value in node.items()
+                    if isinstance(value, (dict, list)) and key not in skip_keys
+                ]
+                stack.extend(reversed(children))
+            
+            elif isinstance(node, list):
+                for idx in range(len(node) - 1, -1, -1):
+                    item = node[idx]
+                    if isinstance(item, (dict, list)):
+                        stack.append((item, f"{node_path}[{idx}]"))
+        
+        return events
+    
+    def analyze_coverage(self) -> Dict:
+        """
+        基于【相邻有效点击边界】的埋点归因模型
+        归因区间：[click_i, click_{i+1})
+        """
+        # 1️⃣ 获取有效点击
+        valid_clicks, invalid_clicks = self._partition_clicks()
+
+        print(f"\n🔍 分析覆盖率（相邻点击归因模型）...")
+        print(f"   有效点击: {len(valid_clicks)}")
+        print(f"   无效点击: {len(invalid_clicks)}")
+
+        if not valid_clicks:
+            return {}
+
+        # 2️⃣ 按时间排序（埋点已在 __init__ 中排好序）
+        valid_clicks_sorted = sorted(valid_clicks, key=lambda x: x.get("timestamp_ms", 0))
+        bury_requests_sorted = self.bury_requests
+
+        # 时间戳预先抽成平行列表，循环内直接下标访问，不再逐次 dict.get
+        click_times = [c.get("timestamp_ms", 0) for c in valid_clicks_sorted]
+        bury_times = self._bury_ts
+
+        matched = []
+        unmatched_clicks = []
+
+        # 3️⃣ 核心归因逻辑：相邻点击切分
+        # 各点击的归因区间首尾相接、互不重叠，每条埋点天然只会落入一个区间，
+        # 因此直接在有序时间戳上二分定位区间内的第一条埋点即可；
+        # 点击按时间递增，二分下界随之单调前移（双指针），不再每次从头查找
+        last = len(click_times) - 1
+        bury_total = len(bury_times)
+        lo = 0
+        for i, click in enumerate(valid_clicks_sorted):
+            click_time = click_times[i]
+
+            # 当前点击的归因区间结束时间
+            if i < last:
+                next_click_time = click_times[i + 1]
+            else:
+                # 最后一次点击兜底（防止无限吞埋点）
+                next_click_time = click_time + self.TIME_WINDOW_MS
+
+            # 🎯 核心判断：区间 [click_time, next_click_time) 内的第一条埋点
+            lo = bisect_left(bury_times, click_time, lo)
+            if lo < bury_total and bury_times[lo] < next_click_time:
+                bury = bury_requests_sorted[lo]
+                bury_time = bury_times[lo]
+
+                # 提取事件（加载时已按埋点逐条提取好）
+                events = self._bury_events[lo]
+
+                matched.append(Match(
+                    click=click,
+                    bury_request=bury,
+                    events=events,
+                    time_diff_ms=bury_time - click_time,
+                    event_count=len(events),
+                    attribution_window=(click_time, next_click_time)
+                ))
+            else:
+                unmatched_clicks.append(click)
+
+        # 4️⃣ 覆盖率计算
+        total_valid_clicks = len(valid_clicks_sorted)
+        covered_clicks = len(matched)
+        uncovered_clicks = len(unmatched_clicks)
+        coverage_rate = (
+            covered_clicks / total_valid_clicks * 100
+            if total_valid_clicks > 0 else 0
+        )
+
+        print(f"   覆盖率: {coverage_rate:.1f}%")
+
+        # 时间分布统计（所有匹配的时间差一次性分桶）
+        time_diff_distribution = self._histogram(
+            [pair.time_diff_ms for pair in matched],
+            self.TIME_DIFF_EDGES,
+            self.TIME_DIFF_LABELS
+        )
+
+        # 5️⃣ 未覆盖分析
+        unmatched_pages = self._top_k(
+            (c.get("after_activity", "unknown") for c in unmatched_clicks), 10
+        )
+        # element 缺失时才构造空字典；取 label 用 methodcaller，省去逐个生成器帧里的属性查找
+        unmatched_elements = self._top_k(
+            map(_get_label, [c.get("element") or {} for c in unmatched_clicks]), 20
+        )
+
+        # 6️⃣ 无效点击分析
+        invalid_reasons = self._top_k(
+            (c.get("click_validation", {}).get("reason", "unknown") for c in invalid_clicks), 10
+        )
+
+        return {
+            "total_valid_clicks": total_valid_clicks,
+            "total_invalid_clicks": len(invalid_clicks),
+            "covered_clicks": covered_clicks,
+            "uncovered_clicks": uncovered_clicks,
+            "coverage_rate": coverage_rate,
+            "matched_pairs": matched,
+            "unmatched_clicks": unmatched_clicks,
+            "unmatched_pages": unmatched_pages,
+            "unmatched_elements": unmatched_elements,
+            "invalid_reasons": invalid_reasons,
+            "time_diff_distribution": time_diff_distribution
+        }
+    
+    @staticmethod
+    def _top_k(items: Iterable, k: int) -> Dict:
+        """
+        计数并只取出现次数最多的 k 项，返回 {项: 次数}
+        计数走 Counter 的 C 实现，取前 k 用 heapq.nlargest（同次数保持首次出现顺序）
+        """
+        return dict(nlargest(k, Counter(items).items(), key=itemgetter(1)))
+    
+    @staticmethod
+    def _histogram(values: List[int], edges: Tuple[int, ...], labels: Tuple[str, ...]) -> Dict[str, int]:
+        """
+        按边界分桶计数（等于边界的值归入上一档）
+        先整体排序，再对每个边界二分出位置，相邻位置之差即桶内数量
+        """
+        ordered = sorted(values)
+        positions = [0, *(bisect_left(ordered, edge) for edge in edges), len(ordered)]
+        return {
+            label: positions[i + 1] - positions[i]
+            for i, label in enumerate(labels)
+        }
+    
+    def build_trigger_latency_from_coverage(self, coverage: Dict) -> Dict:
+        gaps = [pair.time_diff_ms for pair in coverage.get("matched_pairs", [])]
+        return self._histogram(gaps, self.LATENCY_EDGES, self.LATENCY_LABELS)
+
+    @staticmethod
+    def _short(value, limit: int = 100) -> str:
+        """参数取值样例：字符串先切片再保存，容器只记类型和长度，不展开整个内容"""
+        if isinstance(value, str):
+            return value[:limit]
+        if isinstance(value, (dict, list)):
+            return f"<{type(value).__name__}:{len(value)}>"
+        return str(value)[:limit]
+    
+    def analyze_events(self, coverage: Dict = None) -> Dict:
+        """
+        深度事件分析
+        
+        Args:
+            coverage: 已计算好的 analyze_coverage() 结果；不传时内部重新计算
+        """
+        print(f"\n🔍 分析事件...")
+        
+        total_events = 0
+        event_counts = Counter()
+        event_params = {}  # (事件名, 参数名) -> 参数取值样例集合
+        
+        # 单次遍历：提取事件的同时完成事件统计与参数统计
+        for events in self._bury_events:
+            total_events += len(events)
+            # 每条请求批量计数，计数循环在 Counter 的 C 实现中完成
+            event_counts.update([evt["event"] for evt in events])
+            
+            # 只保留聚合结果，不再缓存逐条事件明细
+            for evt in events:
+                params = evt["params"]
+                if params:
+                    event_name = evt["event"]
+                    for param_key, param_value in params.items():
+                        key = (event_name, param_key)
+                        values = event_params.get(key)
+                        if values is None:
+                            values = event_params[key] = set()
+                        # 报告只展示有限个取值，超出上限的不再保存
+                        if len(values) < self.MAX_PARAM_VALUES:
+                            values.add(self._short(param_value))
+        
+        # 响应时间分析
+        if coverage is None:
+            coverage = self.analyze_coverage()
+        trigger_latency = self.build_trigger_latency_from_coverage(coverage)
+        
+        # 按首次出现顺序还原为 {事件: {参数: [取值...]}}
+        grouped_params = {}
+        for (event_name, param_key), values in event_params.items():
+            grouped_params.setdefault(event_name, {})[param_key] = list(values)
+        
+        print(f"   事件总数: {total_events}")
+        print(f"   事件类型: {len(event_counts)}")
+        
+        return {
+            "total_events": total_events,
+            "unique_event_types": len(event_counts),
+            "event_counts": event_counts,
+            "event_params": grouped_params,
+            "trigger_latency": trigger_latency
+        }
+    
+    def analyze_attributes(self, event_analysis: Dict) -> Dict:
+        """属性深度分析"""
+        print(f"\n🔍 分析属性...")
+        
+        # 统计每个事件的参数完整度
+        event_param_stats = {}
+        
+        for event, params in event_analysis["event_params"].items():
+            param_count = len(params)
+            param_value_counts = {
+                param: len(values) 
+                for param, values in params.items()
+            }
+            
+            event_param_stats[event] = {
+                "param_count": param_count,
+                "param_names": list(params.keys()),
+                "param_diversity": param_value_counts
+            }
+        
+        # 找出参数最丰富和最贫瘠的事件
+        events_by_param_count = sorted(
+            event_param_stats.items(),
+            key=lambda x: x[1]["param_count"],
+            reverse=True
+        )
+        
+        # 分析常见参数（直接对各事件的参数名计数，不再拼接中间列表）
+        common_params = self._top_k(
+            chain.from_iterable(params.keys() for params in event_analysis["event_params"].values()), 20
+        )
+        
+        return {
+            "event_param_stats": event_param_stats,
+            "richest_events": events_by_param_count[:10],
+            "poorest_events": events_by_param_count[-10:],
+            "common_params": common_params
+        }
+    
+    def calculate_quality_score(self, coverage: Dict, event_analysis: Dict, attr_analysis: Dict) -> Dict:
+        """计算埋点质量评分"""
+        score = {}
+        
+        # 1. 覆盖率 (40分)
+        score["覆盖率"] = int(coverage["coverage_rate"] * 0.4)
+        
+        # 2. 事件丰富度 (25分)
+        event_types = event_analysis["unique_event_types"]
+        score["事件丰富度"] = min(25, event_types * 2)
+        
+        # 3. 响应及时性 (20分)
+        latency = event_analysis["trigger_latency"]
+        total_events = sum(latency.values())
+        if total_events > 0:
+            fast_ratio = (latency["即时(<500ms)"] + latency["快速(500ms-2s)"]) / total_events
+            score["响应及时性"] = int(fast_ratio * 20)
+        else:
+            score["响应及时性"] = 0
+        
+        # 4. 参数完整度 (15分)
+        if len(attr_analysis["event_param_stats"]) > 0:
+            avg_params = sum(
+                stat["param_count"] 
+                for stat in attr_analysis["event_param_stats"].values()
+            ) / len(attr_analysis["event_param_stats"])
+            score["参数完整度"] = min(15, int(avg_params * 1.5))
+        else:
+            score["参数完整度"] = 0
+        
+        score["总分"] = sum(score.values())
+        
+        # 评级
+        total = score["总分"]
+        if total >= 90:
+            score["评级"] = "A+ 优秀"
+        elif total >= 80:
+            score["评级"] = "A 良好"
+        elif total >= 70:
+            score["评级"] = "B 中等"
+        elif total >= 60:
+            score["评级"] = "C 及格"
+        else:
+            score["评级"] = "D 需改进"
+        
+        return score
+    
+    def generate_report(self, output=None):
+        """生成详细报告"""
+        print("\n" + "="*60)
+        print("🚀 开始分析...")
+        print("="*60)
+        
+        # 分析
+        coverage = self.analyze_coverage()
+        event_analysis = self.analyze_events(coverage)
+        attr_analysis = self.analyze_attributes(event_analysis)
+        quality_score = self.calculate_quality_score(coverage, event_analysis, attr_analysis)
+        
+        # 文件名与报告页共用同一个生成时间，只取一次当前时间
+        now = datetime.now()
+        
+        # 自动生成带时间戳的文件名
+        if not output:
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
+            output = f"埋点分析报告_{timestamp}.html"
+        
+        # 生成 HTML（直接写入文件）
+        with open(output, "w", encoding="utf-8", buffering=1 << 16) as f:
+            self._write_html(f, coverage, event_analysis, attr_analysis, quality_score,
+                             generated_at=now.strftime("%Y-%m-%d %H:%M:%S"))
+        
+        print("\n" + "="*60)
+        print(f"✅ 报告已生成: {output}")
+        print(f"📊 有效点击数: {coverage['total_valid_clicks']}")
+        print(f"📊 埋点覆盖率: {coverage['coverage_rate']:.1f}%")
+        print(f"🏆 质量评分: {quality_score['总分']}/100 ({quality_score['评级']})")
+        print("="*60)
+        
+        return output
+    
+    @staticmethod
+    def _fmt_hms(ts_ms: float) -> str:
+        """毫秒时间戳 -> 本地时间 HH:MM:SS（直接取 struct_time 字段，不构造 datetime 也不走 strftime）"""
+        t = time.localtime(ts_ms / 1000)
+        return f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+    
+    def _write_html(self, f, coverage: Dict, events: Dict, attrs: Dict, score: Dict,
+                    generated_at: str = None):
+        """生成 HTML 报告并写入文件对象 f（静态头部原样写出，只对正文做占位替换）"""
+        if generated_at is None:
+            generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # 事件表格
+        event_rows = []
+        for event, count in events["event_counts"].most_common(30):
+            params = events["event_params"].get(event, {})
+            param_names = list(params.keys())[:8]
+            
+            event_rows.append(f"""
+            <tr>
+                <td><strong>{event}</strong></td>
+                <td>{count}</td>
+                <td>{len(params)}</td>
+                <td><code>{', '.join(param_names) if param_names else '-'}</code></td>
+            </tr>
+            """)
+        event_html = "".join(event_rows)
+        
+        # 未覆盖点击
+        unmatched_rows = []
+        for click in coverage["unmatched_clicks"][:40]:
+            element = click.get("element", {})
+            unmatched_rows.append(f"""
+            <tr>
+                <td>{click.get('after_activity', 'unknown')}</td>
+                <td>{element.get('label', 'unknown')[:60]}</td>
+                <td>{element.get('class', 'unknown')}</td>
+                <td>{self._fmt_hms(click.get('timestamp_ms', 0))}</td>
+            </tr>
+            """)
+        unmatched_html = "".join(unmatched_rows)
+        
+        if not unmatched_html:
+            unmatched_html = "<tr><td colspan='4' style='text-align:center;color:#999;'>暂无数据</td></tr>"
+        
+        # 匹配对
+        matched_rows = []
+        for pair in coverage["matched_pairs"][:40]:
+            click = pair.click
+            element = click.get("element", {})
+            events_list = pair.events
+            # 只展示前3个事件名，其余不必取
+            event_names = [e.get("event", "unknown") for e in events_list[:3]]
+            
+            matched_rows.append(f"""
+            <tr>
+                <td>{element.get('label', 'unknown')[:40]}</td>
+                <td><code>{', '.join(event_names)}</code></td>
+                <td>{pair.event_count}</td>
+                <td>{pair.time_diff_ms} ms</td>
+            </tr>
+            """)
+        matched_html = "".join(matched_rows)
+        
+        if not matched_html:
+            matched_html = "<tr><td colspan='4' style='text-align:center;color:#999;'>暂无数据</td></tr>"
+        
+        # 未覆盖页面统计（占比分母在循环外算一次）
+        valid_total = max(coverage['total_valid_clicks'], 1)
+        page_stats_rows = []
+        for page, count in coverage["unmatched_pages"].items():
+            page_stats_rows.append(f"""
+            <tr>
+                <td><code>{page}</code></td>
+                <td>{count}</td>
+                <td>{count / valid_total * 100:.1f}%</td>
+            </tr>
+            """)
+        page_stats_html = "".join(page_stats_rows)
+        
+        if not page_stats_html:
+            page_stats_html = "<tr><td colspan='3' style='text-align:center;color:#999;'>暂无数据</td></tr>"
+        
+        # 参数丰富度分析
+        param_rich_rows = []
+        for event, stat in attrs["richest_events"][:15]:
+            param_rich_rows.append(f"""
+            <tr>
+                <td><strong>{event}</strong></td>
+                <td>{stat['param_count']}</td>
+                <td><code>{', '.join(stat['param_names'][:6])}</code></td>
+            </tr>
+            """)
+        param_rich_html = "".join(param_rich_rows)
+        
+        # 常见参数
+        common_params_rows = []
+        for param, count in islice(attrs["common_params"].items(), 20):
+            common_params_rows.append(f"""
+            <tr>
+                <td><code>{param}</code></td>
+                <td>{count}</td>
+            </tr>
+            """)
+        common_params_html = "".join(common_params_rows)
+        
+        # 无效点击原因
+        invalid_total = max(coverage['total_invalid_clicks'], 1)
+        invalid_reasons_rows = []
+        for reason, count in coverage["invalid_reasons"].items():
+            invalid_reasons_rows.append(f"""
+            <tr>
+                <td>{reason}</td>
+                <td>{count}</td>
+                <td>{count / invalid_total * 100:.1f}%</td>
+            </tr>
+            """)
+        invalid_reasons_html = "".join(invalid_reasons_rows)
+        
+        if not invalid_reasons_html:
+            invalid_reasons_html = "<tr><td colspan='3' style='text-align:center;color:#999;'>暂无数据</td></tr>"
+        
+        # 响应时间分布（总数只计算一次，供各行占比与优化建议复用）
+        trigger_latency = events["trigger_latency"]
+        latency_total = max(sum(trigger_latency.values()), 1)
+        latency_html = "".join([
+            f"<tr><td>{label}</td><td>{count}</td><td>{count / latency_total * 100:.1f}%</td></tr>"
+            for label, count in trigger_latency.items()
+        ])
+        
+        # 提示与优化建议（条件片段先求值，模板只做占位替换）
+        if coverage['coverage_rate'] < 60:
+            coverage_alert_html = '<div class="alert alert-warning"><strong>⚠️ 覆盖率偏低</strong><br>建议补充缺失的埋点事件，重点关注高频未覆盖页面</div>'
+        else:
+            coverage_alert_html = '<div class="alert alert-success"><strong>✅ 覆盖率良好</strong><br>埋点设置较为完善，继续保持</div>'
+        
+        rec_urgent_html = '<li><strong>紧急</strong>：覆盖率低于60%，建议立即补充埋点</li>' if coverage['coverage_rate'] < 60 else ''
+        rec_pages_html = '<li>优先为高频未覆盖页面补充埋点：' + ', '.join(islice(coverage['unmatched_pages'], 3)) + '</li>' if coverage['uncovered_clicks'] > 0 else ''
+        rec_time_diff_html = '<li>检查时间差较大的匹配对（>5000ms），优化埋点触发时机</li>' if any(p.time_diff_ms > 5000 for p in coverage['matched_pairs'][:20]) else ''
+        if score['参数完整度'] < 12:
+            avg_params = sum(s['param_count'] for s in attrs['event_param_stats'].values()) / max(len(attrs['event_param_stats']), 1)
+            rec_params_html = f'<li>补充事件参数，提高数据分析维度（当前平均参数数：{avg_params:.1f}）</li>'
+        else:
+            rec_params_html = '<li>参数定义完整，继续保持</li>'
+        if score['响应及时性'] < 15:
+            slow_pct = (trigger_latency['延迟(5s-10s)'] + trigger_latency['很慢(>10s)']) / latency_total * 100
+            rec_latency_html = f'<li>优化埋点响应速度，减少延迟（当前延迟占比：{slow_pct:.1f}%%）</li>'
+        else:
+            rec_latency_html = '<li>响应速度良好</li>'
+        rec_window_html = '<li><strong>注意</strong>：当前时间窗口为' + str(self.TIME_WINDOW_MS) + 'ms，如需调整请修改配置</li>' if self.TIME_WINDOW_MS != 3000 else ''
+        
+        time_diff = coverage['time_diff_distribution']
+        f.write(_REPORT_HEAD)
+        f.write(_REPORT_TMPL.substitute(
+            generated_at=generated_at,
+            bury_point_domain=self.BURY_POINT_DOMAIN,
+            time_window_ms=self.TIME_WINDOW_MS,
+            score_total=score['总分'],
+            score_grade=score['评级'],
+            score_coverage=score['覆盖率'],
+            score_richness=score['事件丰富度'],
+            score_timeliness=score['响应及时性'],
+            score_completeness=score['参数完整度'],
+            total_valid_clicks=coverage['total_valid_clicks'],
+            covered_clicks=coverage['covered_clicks'],
+            uncovered_clicks=coverage['uncovered_clicks'],
+            coverage_rate=f"{coverage['coverage_rate']:.1f}",
+            total_invalid_clicks=coverage['total_invalid_clicks'],
+            diff_0_1s=time_diff['0-1s'],
+            diff_1_3s=time_diff['1-3s'],
+            diff_3_5s=time_diff['3-5s'],
+            diff_5_10s=time_diff['5-10s'],
+            coverage_alert_html=coverage_alert_html,
+            total_events=events['total_events'],
+            unique_event_types=events['unique_event_types'],
+            event_html=event_html,
+            matched_html=matched_html,
+            unmatched_html=unmatched_html,
+            page_stats_html=page_stats_html,
+            param_rich_html=param_rich_html,
+            common_params_html=common_params_html,
+            latency_html=latency_html,
+            rec_urgent_html=rec_urgent_html,
+            rec_pages_html=rec_pages_html,
+            rec_time_diff_html=rec_time_diff_html,
+            rec_params_html=rec_params_html,
+            rec_latency_html=rec_latency_html,
+            rec_window_html=rec_window_html,
+        ))
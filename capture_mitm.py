@@ -1,33 +1,66 @@
 # capture_mitm.py
 import json
+import re
 import time
+import queue
 import threading
 from datetime import datetime
 from mitmproxy import http, ctx
 from config import CONFIG
-from request_monitor import RequestClassifier  # 复用你的分类器
+from json_utils import json_loads, json_dumps
+from request_monitor import RequestClassifier, ActionMarker  # 复用你的分类器
 
 # ======================
 # 会话信息
 # ======================
 CURRENT_SESSION_ID = None
 OUT_FILE = None
+LINE_PREFIX = None           # 每行固定的开头 {"session_id":"...",，开新 session 时生成一次
 
 # ======================
 # 实时状态（关键）
 # ======================
+# 单个整数的读写在 GIL 下是原子的，读写这几个时间戳无需加锁
 LAST_ACTION_TS = time.time()
 LAST_REQUEST_TS = 0          # 最近一次任何请求
 LAST_BUSINESS_TS = 0         # 最近一次业务请求
-LOCK = threading.Lock()
+
+# 爬虫通过共享内存写入的点击时间（不可用时只依赖 /mark_action）
+try:
+    ACTION_MARKER = ActionMarker()
+except OSError:
+    ACTION_MARKER = None
+
+def last_action_ts() -> float:
+    """最近一次点击时间（秒）：取共享内存标记与 /mark_action 中较新的一个"""
+    if ACTION_MARKER is None:
+        return LAST_ACTION_TS
+    return max(LAST_ACTION_TS, ACTION_MARKER.last_action_ms() / 1000)
+
+# ======================
+# 日志写入（后台线程）
+# ======================
+# 请求处理只负责入队，由后台线程持有文件句柄批量落盘，
+# 不再每条请求 open + flush，也不阻塞 mitmproxy 的事件循环
+WRITE_QUEUE = queue.Queue(maxsize=10000)   # 有界：磁盘跟不上时丢行而不是拖慢代理
+WRITE_BATCH = 512            # 写线程单次最多合并写入的行数
+DROPPED_LINES = 0            # 队列满被丢弃的行数
+FLUSH_EVERY_LINES = 256      # 累计多少行刷新一次
+FLUSH_INTERVAL_S = 1.0       # 最长多久刷新一次（秒）
+_WRITER_STOP = object()
+_WRITER_THREAD = None
+
+# 静态资源（按路径后缀判断，允许后跟查询串/锚点）
+_STATIC_RE = re.compile(r"\.(?:jpg|jpeg|png|gif|mp4|css|woff2?|svg|ico)(?:[?#]|$)", re.I)
 
 # ======================
 # Session 管理
 # ======================
 def start_new_session():
-    global CURRENT_SESSION_ID, OUT_FILE
+    global CURRENT_SESSION_ID, OUT_FILE, LINE_PREFIX
     CURRENT_SESSION_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
     OUT_FILE = f"log/mitm_requests_{CURRENT_SESSION_ID}.jsonl"
+    LINE_PREFIX = b'{"session_id":' + json_dumps(CURRENT_SESSION_ID) + b","
 
     info = {
         "session_id": CURRENT_SESSION_ID,
@@ -38,6 +71,8 @@ def start_new_session():
     with open("log/current_mitm_session.json", "w", encoding="utf-8") as f:
         json.dump(info, f)
 
+    _ensure_writer()
+
     ctx.log.info(f"🆕 新抓包 session: {CURRENT_SESSION_ID}")
 
 # ======================
@@ -48,19 +83,108 @@ def now_ms():
 
 def safe_decode(content: bytes):
     try:
-        return json.loads(content.decode())
+        return json_loads(content)
     except Exception:
         try:
             return content.decode(errors="ignore")
         except Exception:
             return None
 
-def write_line(obj: dict):
-    """线程安全地写一行 JSON"""
-    with LOCK:
-        with open(OUT_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-            f.flush()
+def raw_json_body(content: bytes):
+    """
+    body 本身是合法 JSON 且不含换行时，返回可原样拼进日志行的 bytes，否则返回 None
+    省去「解析成对象 -> 再序列化」的往返，原文只拷贝一次
+    """
+    body = content.strip()
+    if body[:1] not in (b"{", b"[") or b"\n" in body or b"\r" in body:
+        return None
+    try:
+        # 只做校验，保证拼出来的行仍是合法 JSON；按 UTF-8 解码后再解析，
+        # 避免标准库对 bytes 自动识别 UTF-16/32，把非 UTF-8 原文拼进 UTF-8 日志行
+        json_loads(body.decode("utf-8"))
+    except Exception:
+        return None
+    return body
+
+def write_line(fields: dict, body: bytes):
+    """
+    拼出一行 JSON 并交给后台写线程（线程安全，不做磁盘 IO）
+    行 = 预生成的 session_id 前缀 + fields 各字段 + 最后的 "body" 字段
+    fields: 非空字典，不含 session_id / body
+    body: body 字段的 JSON 片段（已校验的原文或已序列化的值）
+    """
+    global DROPPED_LINES
+    line = LINE_PREFIX + json_dumps(fields)[1:-1] + b',"body":' + body + b"}\n"
+    try:
+        WRITE_QUEUE.put_nowait((OUT_FILE, line))
+    except queue.Full:
+        DROPPED_LINES += 1
+
+def _writer_loop():
+    """
+    后台写线程：保持文件句柄打开，把队列中积压的行成批 writelines，
+    队列取空、满 FLUSH_EVERY_LINES 行或 FLUSH_INTERVAL_S 秒时刷新
+    """
+    fh = None
+    fh_path = None
+    pending = 0
+    last_flush = time.monotonic()
+
+    while True:
+        try:
+            batch = [WRITE_QUEUE.get(timeout=FLUSH_INTERVAL_S)]
+        except queue.Empty:
+            batch = []
+        # 顺手取走已经积压的行，合并成一次写入
+        while len(batch) < WRITE_BATCH:
+            try:
+                batch.append(WRITE_QUEUE.get_nowait())
+            except queue.Empty:
+                break
+
+        stop = False
+        lines = []
+        for item in batch:
+            if item is _WRITER_STOP:
+                stop = True
+                break
+            path, line = item
+            # 新 session 切换到新文件
+            if path != fh_path:
+                if lines:
+                    fh.writelines(lines)
+                    pending += len(lines)
+                    lines = []
+                if fh:
+                    fh.close()
+                fh = open(path, "ab", buffering=1 << 16)
+                fh_path = path
+            lines.append(line)
+
+        if lines:
+            fh.writelines(lines)
+            pending += len(lines)
+
+        if stop:
+            if fh:
+                fh.close()
+            return
+
+        # 队列已取空（暂无后续请求）时立即刷新，保证爬虫检查点击效果时读得到最新请求；
+        # 请求密集时仍按行数 / 时间批量刷新
+        if pending and (WRITE_QUEUE.empty()
+                        or pending >= FLUSH_EVERY_LINES
+                        or time.monotonic() - last_flush >= FLUSH_INTERVAL_S):
+            fh.flush()
+            pending = 0
+            last_flush = time.monotonic()
+
+def _ensure_writer():
+    """首次开始 session 时启动后台写线程"""
+    global _WRITER_THREAD
+    if _WRITER_THREAD is None or not _WRITER_THREAD.is_alive():
+        _WRITER_THREAD = threading.Thread(target=_writer_loop, name="mitm-writer", daemon=True)
+        _WRITER_THREAD.start()
 
 # ======================
 # mitmproxy 主入口
@@ -92,16 +216,16 @@ def request(flow: http.HTTPFlow):
     # 📡 实时活动查询接口（关键）
     # ======================
     if path == "/__activity__":
-        with LOCK:
-            payload = {
-                "now": now,
-                "last_request_ts": LAST_REQUEST_TS,
-                "last_business_ts": LAST_BUSINESS_TS
-            }
+        payload = {
+            "now": now,
+            "last_request_ts": LAST_REQUEST_TS,
+            "last_business_ts": LAST_BUSINESS_TS,
+            "last_action_ts": int(last_action_ts() * 1000)
+        }
 
         flow.response = http.Response.make(
             200,
-            json.dumps(payload).encode(),
+            json_dumps(payload),
             {"Content-Type": "application/json"}
         )
         return
@@ -112,43 +236,51 @@ def request(flow: http.HTTPFlow):
     if not OUT_FILE:
         return  # 尚未 start_session
 
+    # 🚫 静态资源不记录（先看 path，命中时连完整 URL 都不用拼）
+    if _STATIC_RE.search(path):
+        return
+
     url = flow.request.pretty_url
     host = flow.request.host
 
-    # 🚫 静态资源不记录
-    if any(x in url for x in [".jpg", ".png", ".mp4", ".css", ".woff"]):
-        return
-
     # ======================
     # 更新实时状态
     # ======================
-    with LOCK:
-        LAST_REQUEST_TS = now
+    req_type = RequestClassifier.classify_request(host, "")  # 分类器按 host 缓存结果
 
-        req_type = RequestClassifier.classify_request(host, url)
-        if req_type == "business":
-            LAST_BUSINESS_TS = now
+    LAST_REQUEST_TS = now
+    if req_type == "business":
+        LAST_BUSINESS_TS = now
 
     # ======================
     # 写入日志（供离线分析）
     # ======================
     item = {
-        "session_id": CURRENT_SESSION_ID,
         "timestamp": now,
         "host": host,
         "method": flow.request.method,
         "url": url,
         "path": path,
         "classified_type": req_type,
-        "action_gap_ms": int((time.time() - LAST_ACTION_TS) * 1000),
-        "body": safe_decode(flow.request.content) if flow.request.content else None
+        "action_gap_ms": int((time.time() - last_action_ts()) * 1000),
     }
 
-    write_line(item)
+    content = flow.request.content
+    body = raw_json_body(content) if content else None
+    if body is None:
+        body = json_dumps(safe_decode(content) if content else None)
+
+    write_line(item, body)
     ctx.log.info(f"🌐 {req_type.upper():8s} {host} {flow.request.method} {path}")
 
 # ======================
 # mitmproxy 退出
 # ======================
 def done():
+    # 写完队列中剩余的行并关闭文件
+    if _WRITER_THREAD is not None:
+        WRITE_QUEUE.put(_WRITER_STOP)
+        _WRITER_THREAD.join(timeout=5)
+    if DROPPED_LINES:
+        ctx.log.warn(f"⚠️ 写入队列已满，丢弃 {DROPPED_LINES} 行日志")
     ctx.log.info(f"✅ 抓包完成，日志文件：{OUT_FILE}")
\ No newline at end of file
@@ -8,10 +8,17 @@
 """
 
 import time
-import os
-import re
-import json
-import xml.etree.ElementTree as ET
+import atexit
+import shlex
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from lxml import etree as ET        # libxml2 C 实现，解析与遍历更快
+except ImportError:                     # 未安装 lxml 时退回标准库
+    import xml.etree.ElementTree as ET
+    _HAS_LXML = False
+else:
+    _HAS_LXML = True
 from typing import List, Dict, Tuple, Optional, Set
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
@@ -21,11 +28,25 @@ from datetime import datetime
 import hashlib
 
 from config import CONFIG
-from request_monitor import RequestMonitor, RequestClassifier  
+from json_utils import json_dumps
+from request_monitor import RequestMonitor, RequestClassifier, ActionMarker, RequestRecord
 
 from enum import Enum, auto
 
 
+def _adb(*args: str, timeout: float = None) -> bytes:
+    """直接执行一次 adb（不经过 /bin/sh），返回标准输出"""
+    return subprocess.run(
+        ["adb", *args],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout, check=False
+    ).stdout
+
+
+def _short_hash(data: bytes, size: int = 6) -> str:
+    """短摘要：blake2b 直接输出 size 字节（十六进制长度 2*size），比 md5 更快"""
+    return hashlib.blake2b(data, digest_size=size).hexdigest()
+
+
 class BackResult(Enum):
     OK_RETURN = auto()     # 正常返回到父页面
     NO_EFFECT = auto()     # back 无效（页面没变）
@@ -47,31 +68,31 @@ class PageFingerprint:
         5. 元素坐标分布特征
         6. Resource ID 特征
         """
-        # 1. 前 10 个元素的标签（从 5 增加到 10）
-        element_labels = [elem.get("label", "")[:30] for elem in elements[:10]]
-        
-        # 2. 所有元素文本的组合 hash
-        all_texts = "".join([elem.get("text", "") for elem in elements])
-        text_hash = hashlib.md5(all_texts.encode()).hexdigest()[:8]
-        
-        # 3. 坐标分布特征（防止文本相同但布局不同）
-        coords_sum = sum([sum(elem.get("coords", [0, 0])) for elem in elements[:20]])
-        
-        # 4. Resource ID 特征
-        resource_ids = [elem.get("resource_id", "")[-20:] for elem in elements[:5]]
-        
-        fingerprint_data = {
-            "activity": activity,
-            "element_count": element_count,
-            "labels": element_labels,
-            "text_hash": text_hash,
-            "coords_sum": coords_sum,
-            "resource_ids": resource_ids,
-        }
+        # 一次遍历收集全部特征
+        h = hashlib.blake2b(digest_size=4)  # 所有元素文本的组合 hash（逐个喂入，不拼接大字符串）
+        element_labels = []                 # 前 10 个元素的标签（从 5 增加到 10）
+        coords_sum = 0                      # 前 20 个元素的坐标和（防止文本相同但布局不同）
+        resource_ids = []                   # 前 5 个元素的 Resource ID 特征
+        for i, elem in enumerate(elements):
+            h.update(elem.get("text", "").encode())
+            if i < 20:
+                coords_sum += sum(elem.get("coords", (0, 0)))
+                if i < 10:
+                    element_labels.append(elem.get("label", "")[:30])
+                    if i < 5:
+                        resource_ids.append(elem.get("resource_id", "")[-20:])
+        text_hash = h.hexdigest()
         
-        # 生成 hash
-        fp_str = json.dumps(fingerprint_data, sort_keys=True)
-        return hashlib.md5(fp_str.encode()).hexdigest()[:12]
+        # 生成 hash（字段固定，用控制字符分隔拼接即可，无需 JSON 序列化）
+        fp_str = "\x1e".join((
+            activity,
+            str(element_count),
+            "\x1f".join(element_labels),
+            text_hash,
+            str(coords_sum),
+            "\x1f".join(resource_ids),
+        ))
+        return _short_hash(fp_str.encode())
     
     @staticmethod
     def is_page_changed(fp1: str, fp2: str) -> bool:
@@ -81,6 +102,8 @@ class PageFingerprint:
 class ClickLogger:
     """点击日志记录器 - 基于页面变化"""
     
+    FLUSH_EVERY = 16  # 累计多少条日志刷新一次到磁盘
+    
     def __init__(self, log_file: str = None):
         if not log_file:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -88,9 +111,11 @@ class ClickLogger:
         
         self.log_file = log_file
         self.click_count = 0
+        self._pending = 0
         
-        with open(self.log_file, "w", encoding="utf-8") as f:
-            pass
+        # 文件句柄常驻，每条日志只写入缓冲区，攒够一批再刷新
+        self._fh = open(self.log_file, "wb", buffering=1 << 16)
+        atexit.register(self.close)
         
         print(f"📝 点击日志: {self.log_file}")
     
@@ -114,6 +139,20 @@ class ClickLogger:
             click_reason: 点击有效的原因
             request_info: 请求信息
         """
+        # 请求相关字段只在有请求信息时提取一次
+        if request_info:
+            has_business = request_info.get("has_business", False)
+            has_burying = request_info.get("has_burying", False)
+            business_count = request_info.get("business_count", 0)
+            burying_count = request_info.get("burying_count", 0)
+            business_requests = [self._brief_request(r) for r in request_info.get("business_requests", [])]
+            burying_requests = [self._brief_request(r) for r in request_info.get("burying_requests", [])]
+        else:
+            has_business = has_burying = False
+            business_count = burying_count = 0
+            business_requests = []
+            burying_requests = []
+        
         log_entry = {
             "click_id": self.click_count,
             "timestamp": datetime.now().isoformat(),
@@ -139,39 +178,45 @@ class ClickLogger:
             "click_validation": {
                 "reason": click_reason,  # "business_request" | "page_change" | "both"
                 "page_changed": page_changed,
-                "has_business_request": request_info.get("has_business", False) if request_info else False,
-                "has_burying_point": request_info.get("has_burying", False) if request_info else False,
+                "has_business_request": has_business,
+                "has_burying_point": has_burying,
             },
             
             # ✅ 请求详情
             "requests": {
-                "business_count": request_info.get("business_count", 0) if request_info else 0,
-                "burying_count": request_info.get("burying_count", 0) if request_info else 0,
-                "business_requests": [
-                    {
-                        "method": r.get("method"),
-                        "host": r.get("host"),
-                        "path": r.get("path", ""),
-                        "url": r.get("url", "")
-                    }
-                    for r in request_info.get("business_requests", [])
-                ] if request_info else [],
-                "burying_requests": [
-                    {
-                        "method": r.get("method"),
-                        "host": r.get("host"),
-                        "path": r.get("path", ""),
-                        "url": r.get("url", "")
-                    }
-                    for r in request_info.get("burying_requests", [])
-                ] if request_info else [],
+                "business_count": business_count,
+                "burying_count": burying_count,
+                "business_requests": business_requests,
+                "burying_requests": burying_requests,
             }
         }
         
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+        self._fh.write(json_dumps(log_entry) + b"\n")
+        self._pending += 1
+        if self._pending >= self.FLUSH_EVERY:
+            self.flush()
         
         self.click_count += 1
+    
+    @staticmethod
+    def _brief_request(r: RequestRecord) -> Dict:
+        """请求摘要：只保留日志需要的字段"""
+        return {
+            "method": r.method,
+            "host": r.host,
+            "path": r.path,
+            "url": r.url
+        }
+    
+    def flush(self):
+        """把缓冲中的日志写到磁盘"""
+        if not self._fh.closed:
+            self._fh.flush()
+        self._pending = 0
+    
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
 
     def get_summary(self):
         return {
@@ -184,21 +229,63 @@ class OptimizedUIParser:
     
     def __init__(self, coord_threshold: int = 30):
         self.coord_threshold = coord_threshold
-        self.parent_map = {}
+    
+    @staticmethod
+    def _xml_parser():
+        """
+        lxml 下丢弃空白文本、注释与处理指令，树更小且只剩元素节点
+        （lxml 解析器不能跨线程共用，每次新建）；标准库用默认解析器
+        """
+        if _HAS_LXML:
+            return ET.XMLParser(remove_blank_text=True, remove_comments=True, remove_pis=True)
+        return None
     
     def parse_xml_file(self, xml_path: str = "ui.xml") -> List[Dict]:
-        tree = ET.parse(xml_path)
+        tree = ET.parse(xml_path, self._xml_parser())
         root = tree.getroot()
         return self._parse_tree(root)
     
+    def parse_xml_string(self, xml: str) -> List[Dict]:
+        # 交给解析器按 XML 声明自行解码
+        return self.parse_xml_bytes(xml.encode("utf-8"))
+    
+    def parse_xml_bytes(self, data: bytes) -> List[Dict]:
+        root = ET.fromstring(data, self._xml_parser())
+        return self._parse_tree(root)
+    
     def _parse_tree(self, root: ET.Element) -> List[Dict]:
-        self.parent_map = {c: p for p in root.iter() for c in p}
         raw_elements = self._extract_clickable_elements(root)
-        filtered_elements = self._filter_nested_clickables(raw_elements)
-        unique_elements = self._deduplicate_by_coords(filtered_elements)
+        unique_elements = self._deduplicate_by_coords(raw_elements)
         enhanced_elements = self._enhance_text(unique_elements)
         return enhanced_elements
     
+    # 有 bounds、且没有可点击祖先的可点击节点（lxml 下由 libxml2 直接筛选）
+    _CLICKABLE_XPATH = ("descendant-or-self::*[@clickable='true' and @bounds != ''"
+                        " and not(ancestor::*[@clickable='true'])]")
+    
+    def _iter_clickable_nodes(self, root: ET.Element):
+        """
+        按文档顺序产出 (可点击节点, 深度)，嵌套在可点击元素内的可点击元素不产出
+        lxml 用 XPath 在 C 里完成筛选；标准库用一次先序栈遍历，
+        栈中携带「是否位于可点击祖先之下」与深度
+        """
+        if _HAS_LXML:
+            for node in root.xpath(self._CLICKABLE_XPATH):
+                yield node, sum(1 for _ in node.iterancestors())
+            return
+        
+        stack = [(root, False, 0)]
+        while stack:
+            node, under_clickable, depth = stack.pop()
+            clickable = node.get('clickable') == 'true'
+            if len(node):
+                # 逆序入栈，保证出栈顺序与文档顺序一致
+                child_flag = under_clickable or clickable
+                stack.extend((child, child_flag, depth + 1) for child in reversed(node))
+            
+            if clickable and not under_clickable:
+                yield node, depth
+    
     def _extract_clickable_elements(self, root: ET.Element) -> List[Dict]:
         elements = []
         
@@ -206,10 +293,7 @@ class OptimizedUIParser:
         BLACKLIST_IDS = ['com.chinamobile.mcloud:id/root']
         CONTAINER_CLASSES = ['RelativeLayout', 'LinearLayout', 'FrameLayout', 'ViewGroup']
         
-        for node in root.iter():
-            if node.get('clickable') != 'true':
-                continue
-            
+        for node, depth in self._iter_clickable_nodes(root):
             bounds = node.get('bounds')
             if not bounds:
                 continue
@@ -242,43 +326,47 @@ class OptimizedUIParser:
                 "content_desc": node.get('content-desc', ''),
                 "bounds": bounds,
                 "coords": coords,
-                "depth": self._get_depth(node)
+                "depth": depth
             }
             elements.append(element)
         
         return elements
     
-    def _filter_nested_clickables(self, elements: List[Dict]) -> List[Dict]:
-        filtered = []
-        for elem in elements:
-            node = elem["node"]
-            has_clickable_ancestor = False
-            current = self.parent_map.get(node)
-            while current is not None:
-                if current.get('clickable') == 'true':
-                    has_clickable_ancestor = True
-                    break
-                current = self.parent_map.get(current)
-            if not has_clickable_ancestor:
-                filtered.append(elem)
-        return filtered
-    
     def _deduplicate_by_coords(self, elements: List[Dict]) -> List[Dict]:
+        """
+        按坐标距离去重：与已保留元素距离小于阈值时视为重复，保留更好的那个
+        已保留元素按阈值大小的网格分桶，只需检查相邻 9 个格子
+        """
+        t = self.coord_threshold
+        if t <= 0:
+            return list(elements)
+        t2 = t * t
         unique = []
+        cells = {}  # (cx, cy) -> [unique 中的下标, ...]
         for elem in elements:
             x, y = elem["coords"]
-            is_duplicate = False
-            for existing in unique:
-                ex, ey = existing["coords"]
-                distance = ((x - ex) ** 2 + (y - ey) ** 2) ** 0.5
-                if distance < self.coord_threshold:
-                    is_duplicate = True
-                    if self._is_better_element(elem, existing):
-                        idx = unique.index(existing)
-                        unique[idx] = elem
-                    break
-            if not is_duplicate:
+            cx, cy = x // t, y // t
+            # 与原先按顺序扫描一致：命中多个时取最早保留的那个
+            dup_idx = None
+            for gx in (cx - 1, cx, cx + 1):
+                for gy in (cy - 1, cy, cy + 1):
+                    for idx in cells.get((gx, gy), ()):
+                        if dup_idx is not None and idx > dup_idx:
+                            continue
+                        ex, ey = unique[idx]["coords"]
+                        if (x - ex) ** 2 + (y - ey) ** 2 < t2:
+                            dup_idx = idx
+            if dup_idx is None:
+                cells.setdefault((cx, cy), []).append(len(unique))
                 unique.append(elem)
+                continue
+            existing = unique[dup_idx]
+            if self._is_better_element(elem, existing):
+                # 替换后按新元素的坐标重新分桶
+                ex, ey = existing["coords"]
+                cells[(ex // t, ey // t)].remove(dup_idx)
+                cells.setdefault((cx, cy), []).append(dup_idx)
+                unique[dup_idx] = elem
         return unique
     
     def _is_better_element(self, elem1: Dict, elem2: Dict) -> bool:
@@ -352,37 +440,89 @@ class OptimizedUIParser:
         return f"<{class_name}>"
     
     def _parse_bounds(self, bounds: str) -> Optional[Tuple[int, int]]:
+        # bounds 形如 "[x1,y1][x2,y2]"，直接切分，不走正则
         try:
-            match = re.match(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
-            if match:
-                x1, y1, x2, y2 = map(int, match.groups())
-                return ((x1 + x2) // 2, (y1 + y2) // 2)
-        except:
-            pass
-        return None
-    
-    def _get_depth(self, node: ET.Element) -> int:
-        depth = 0
-        current = self.parent_map.get(node)
-        while current is not None:
-            depth += 1
-            current = self.parent_map.get(current)
-        return depth
+            a, b = bounds[1:-1].split('][')
+            x1, y1 = a.split(',')
+            x2, y2 = b.split(',')
+            return ((int(x1) + int(x2)) // 2, (int(y1) + int(y2)) // 2)
+        except ValueError:
+            return None
 
 
 class ScreenDisplay:
     """屏幕显示工具"""
     
-    @staticmethod
-    def show_toast(text: str, duration: int = 2):
-        escaped_text = text.replace('"', '\\"').replace("'", "\\'")
-        cmd = f'adb shell "am broadcast -a com.android.test.TOAST -e text \'{escaped_text}\'"'
-        os.system(cmd + " > /dev/null 2>&1")
+    def __init__(self, adb: "AdbShell" = None):
+        self.adb = adb or AdbShell()
+    
+    def show_toast(self, text: str, duration: int = 2):
+        # 文本按设备端 shell 规则整体引用，经常驻 adb shell 发送
+        self.adb.run(f"am broadcast -a com.android.test.TOAST -e text {shlex.quote(text)}")
+
+
+class AdbShell:
+    """常驻 adb shell 会话：命令写进 stdin 执行，省去每次 fork adb + 建立 USB 传输"""
+    
+    # 每条命令后回显的结束标记：读到它说明设备已执行完该命令
+    DONE_MARK = b"__ADB_CMD_DONE__"
+    
+    def __init__(self):
+        self.proc = None
+    
+    def _ensure(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(
+                ["adb", "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+    
+    def run(self, cmd: str):
+        """在设备上执行一条命令，等设备执行完才返回（与 os.system 一样阻塞）"""
+        try:
+            self._ensure()
+            self.proc.stdin.write(f"{cmd}\necho {self.DONE_MARK.decode()}\n".encode())
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            # 会话断开：丢弃后退回一次性 adb 调用，下次再重建会话
+            # （命令作为单个参数交给设备端 shell 解析，与常驻会话一致）
+            self.proc = None
+            _adb("shell", cmd)
+            return
+        
+        # 读掉命令输出，直到结束标记
+        for line in self.proc.stdout:
+            if line.rstrip() == self.DONE_MARK:
+                return
+        # 读到 EOF：会话在执行中断开，命令可能已执行，不再重发，下次重建会话
+        self.proc = None
+    
+    def close(self):
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except Exception:
+                self.proc.kill()
+            self.proc = None
 
 
 class IntegratedCrawler:
     """集成爬虫 - 基于页面变化记录"""
     
+    # 弹窗按钮文字
+    POPUP_KEYWORDS = frozenset(("允许", "拒绝", "确定", "取消", "继续", "跳过", "关闭", "我知道了"))
+    
+    # 页面信息缓存有效期（秒）：短时间内重复获取直接复用，点击/返回后立即失效
+    PAGE_CACHE_TTL = 0.3
+    
+    # 点击后等待效果：最长等待（秒）、轮询间隔（秒）、判定网络空闲的静默时长（毫秒）
+    CLICK_SETTLE_S = 3.0
+    CLICK_POLL_S = 0.2
+    CLICK_IDLE_MS = 500
+    
     def __init__(self, config: Dict = None, mitm_log_file: str = None):
         self.config = config or CONFIG
         self.log_file = mitm_log_file or "/tmp/mitm_requests.jsonl"
@@ -390,8 +530,11 @@ class IntegratedCrawler:
         self.mitm_port = self.config.get("proxy_port", 8080)
         self.driver = None
         self.parser = OptimizedUIParser(coord_threshold=self.config["coord_threshold"])
-        self.screen = ScreenDisplay()
+        self.adb = AdbShell()
+        self.screen = ScreenDisplay(self.adb)
         self.click_logger = ClickLogger()
+        # 点击后抓取界面与检查请求日志互不依赖，用后台线程并行执行
+        self.page_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-info")
 
         
         # 页面指纹识别
@@ -402,6 +545,20 @@ class IntegratedCrawler:
             log_file=self.log_file
         )
         
+        # 点击标记（共享内存，不可用时退回 HTTP 标记）
+        try:
+            self.action_marker = ActionMarker()
+        except OSError:
+            self.action_marker = None
+        
+        # 最近一次页面信息 (activity, elements, fingerprint) 及其获取时间
+        self._page_cache = None
+        self._page_cache_ts = 0.0
+        # 最近一次解析过的 (xml, activity, elements, fingerprint)：XML 原样未变时跳过解析与指纹计算
+        self._last_parsed = (None, None, None, None)
+        # 页面指纹 -> 所属 activity（指纹包含 activity，activity 不同则指纹必然不同）
+        self._fp_activity: Dict[str, str] = {}
+        
         # 遍历状态
         self.visited_pages: Set[str] = set()  # 访问过的页面指纹
         self.current_depth = 0
@@ -415,17 +572,14 @@ class IntegratedCrawler:
             "popups_handled": 0,
         }
     
-    def _get_element_signature(self, elem: Dict) -> str:
+    def _get_element_signature(self, elem: Dict) -> Tuple:
         """
         生成元素唯一签名（用于去重）
         基于：坐标 + 文本 + resource_id
+        只在本页的集合里比较，直接用元组作 key，无需再哈希成字符串
         """
-        coords = elem.get("coords", [0, 0])
-        text = elem.get("text", "")
-        resource_id = elem.get("resource_id", "")
-        
-        sig = f"{coords[0]}_{coords[1]}_{text}_{resource_id}"
-        return hashlib.md5(sig.encode()).hexdigest()[:12]
+        coords = elem.get("coords", (0, 0))
+        return (coords[0], coords[1], elem.get("text", ""), elem.get("resource_id", ""))
     
     def start_driver(self):
         options = UiAutomator2Options()
@@ -452,52 +606,90 @@ class IntegratedCrawler:
         print("⏳ 等待 App 进入主页面...")
         start = time.time()
         last_act = None
-        stable_count = 0
+        stable_since = start
+        i = 0
         
+        # 每次 current_activity 都是一次 Appium HTTP 往返：轮询间隔指数退避，
+        # activity 变化时退避重置，保持连续 3 秒不变才视为就绪
         while time.time() - start < timeout:
             try:
                 act = self.driver.current_activity
-                if act == last_act:
-                    stable_count += 1
-                else:
-                    stable_count = 0
-                if stable_count >= 3 and "logo" not in act.lower():
+                now = time.time()
+                if act != last_act:
+                    last_act = act
+                    stable_since = now
+                    i = 0
+                elif now - stable_since >= 3 and "logo" not in act.lower():
                     print(f"✅ 主页面就绪: {act}")
                     return True
-                last_act = act
-                time.sleep(1)
             except Exception:
-                time.sleep(1)
+                pass
+            time.sleep(min(0.1 * 1.5 ** i, 2.0))
+            i += 1
         
         print("⚠️ 主页面等待超时，仍然尝试遍历")
         return False
     
-    def dump_ui(self) -> bool:
+    def dump_ui(self) -> Optional[str]:
+        """
+        获取当前界面层级 XML
+        优先通过已建立的 Appium 会话取 page_source（无需额外进程、不落盘），
+        失败时退回 adb exec-out 把 uiautomator dump 直接输出到标准输出（不经 sdcard + pull）
+        """
         try:
-            os.system("adb shell uiautomator dump /sdcard/ui.xml > /dev/null 2>&1")
-            os.system("adb pull /sdcard/ui.xml ./ui.xml > /dev/null 2>&1")
-            return os.path.exists("ui.xml")
+            return self.driver.page_source
+        except Exception:
+            pass
+        
+        try:
+            out = _adb("exec-out", "uiautomator", "dump", "/dev/tty", timeout=15)
+            # XML 之后还跟着一行 "UI hierchary dumped to: /dev/tty"
+            end = out.find(b"</hierarchy>")
+            if end != -1:
+                return out[:end + len(b"</hierarchy>")].decode("utf-8")
         except Exception as e:
             print(f"⚠️ UI dump 失败: {e}")
-            return False
+        return None
+    
+    def _invalidate_page_cache(self):
+        """界面可能已变化（点击、返回之后），下次获取页面信息必须重新抓取"""
+        self._page_cache = None
+    
+    def _current_activity(self) -> str:
+        try:
+            return self.driver.current_activity
+        except:
+            return "unknown"
     
-    def get_current_page_info(self) -> Tuple[str, List[Dict], str]:
+    def get_current_page_info(self, force: bool = False,
+                              activity: str = None) -> Tuple[str, List[Dict], str]:
         """
         获取当前页面信息
+        Args:
+            force: 忽略缓存，强制重新抓取
+            activity: 调用方刚取到的当前 activity，传入时不再重复查询
         Returns: (activity, clickable_elements, page_fingerprint)
         """
-        try:
-            activity = self.driver.current_activity
-        except:
-            activity = "unknown"
+        if (not force and self._page_cache is not None
+                and time.monotonic() - self._page_cache_ts < self.PAGE_CACHE_TTL):
+            return self._page_cache
         
-
-        self.dump_ui()
+        if activity is None:
+            activity = self._current_activity()
+        xml = self.dump_ui()
         
         try:
-            elements = self.parser.parse_xml_file("ui.xml")
-            fingerprint = self.page_fp.get_fingerprint(activity, len(elements), elements)
-            return activity, elements, fingerprint
+            if not xml:
+                raise ValueError("未获取到界面 XML")
+            last_xml, last_activity, elements, fingerprint = self._last_parsed
+            if xml != last_xml or activity != last_activity:
+                elements = self.parser.parse_xml_string(xml)
+                fingerprint = self.page_fp.get_fingerprint(activity, len(elements), elements)
+                self._last_parsed = (xml, activity, elements, fingerprint)
+                self._fp_activity[fingerprint] = activity
+            self._page_cache = (activity, elements, fingerprint)
+            self._page_cache_ts = time.monotonic()
+            return self._page_cache
         except Exception as e:
             print(f"⚠️ 获取页面信息失败: {e}")
             return activity, [], ""
@@ -509,7 +701,7 @@ class IntegratedCrawler:
         start = time.time()
 
         while time.time() - start < timeout:
-            _, _, fp = self.get_current_page_info()
+            _, _, fp = self.get_current_page_info(force=True)
             if fp == last_fp and fp:
                 stable += 1
                 if stable >= stable_rounds:
@@ -539,25 +731,48 @@ class IntegratedCrawler:
         print(f"\n{'  ' * self.current_depth}👆 {display_text} @ ({x}, {y})", end="", flush=True)
         self.screen.show_toast(display_text, duration=1)
         
-        os.system(f"adb shell input tap {x} {y}")
+        self.adb.run(f"input tap {x} {y}")
+        self._invalidate_page_cache()
         self._mark_user_action()
         self.stats["total_attempts"] += 1
         
-        # ✅ 等待 3 秒，让请求发出
-        time.sleep(3.0)
-        
-        # ✅ 1. 检查页面指纹变化
-        after_activity, after_elems, after_fp = self.get_current_page_info()
-        page_changed = (after_fp != before_fp)
+        # ✅ 轮询等待点击效果：最多 CLICK_SETTLE_S 秒，
+        # 页面已变化或已有业务请求、且网络短暂空闲后提前结束
+        deadline = click_timestamp / 1000 + self.CLICK_SETTLE_S
+        while True:
+            time.sleep(self.CLICK_POLL_S)
+            
+            # ✅ 1. 后台抓取点击后的页面（Appium 往返），同时在本线程检查请求
+            after_future = self.page_pool.submit(self.get_current_page_info, True)
+            
+            # ✅ 2. 检查请求情况（轮询中只统计数量）
+            request_result = self.request_monitor.check_click_effect(
+                click_timestamp, 
+                duration=3000,
+                counts_only=True
+            )
+            
+            # ✅ 3. 检查页面指纹变化
+            after_activity, after_elems, after_fp = after_future.result()
+            page_changed = (after_fp != before_fp)
+            
+            if time.time() >= deadline:
+                break
+            if page_changed or request_result["has_business"]:
+                try:
+                    if self.is_network_idle(self.CLICK_IDLE_MS):
+                        break
+                except Exception:
+                    pass
         
-        # ✅ 2. 检查请求情况
+        # 轮询结束后再取一次完整结果（含请求明细，供点击日志使用）
         request_result = self.request_monitor.check_click_effect(
             click_timestamp, 
             duration=3000,
             debug=debug_mode
         )
         
-        # ✅ 3. 判断点击有效性
+        # ✅ 4. 判断点击有效性
         # 优先级：业务请求 > 页面变化
         has_business = request_result["has_business"]
         has_burying = request_result["has_burying"]
@@ -587,7 +802,7 @@ class IntegratedCrawler:
         
         print(f" {message}")
         
-        # ✅ 4. 记录日志
+        # ✅ 5. 记录日志
         if click_valid:
             self.stats["successful_clicks"] += 1
             self.click_logger.log_successful_click(
@@ -605,12 +820,16 @@ class IntegratedCrawler:
         return click_valid
 
     def _mark_user_action(self):
+        if self.action_marker is not None:
+            self.action_marker.mark()
+            return
+        
         try:
             requests.get(
                 "http://mark.local/mark_action",
                 proxies={
-                    "http": f"http://{self.config['mitm_host']}:{self.config['mitm_port']}",
-                    "https": f"http://{self.config['mitm_host']}:{self.config['mitm_port']}",
+                    "http": f"http://{self.mitm_host}:{self.mitm_port}",
+                    "https": f"http://{self.mitm_host}:{self.mitm_port}",
                 },
                 timeout=1
             )
@@ -657,16 +876,20 @@ class IntegratedCrawler:
 
     def safe_back(self, target_fp: str, idle_ms: int = 1500) -> BackResult:
         print(f"{'   ' * self.current_depth} ⬅️ 执行返回")
-        os.system("adb shell input keyevent 4")
+        self.adb.run("input keyevent 4")
+        self._invalidate_page_cache()
 
         start = time.time()
+        target_activity = self._fp_activity.get(target_fp)
 
         while time.time() - start < 5:
-            _, _, cur_fp = self.get_current_page_info()
-
             # ✅ 条件 1：UI 语义回到父页面
-            if cur_fp == target_fp:
-                return BackResult.OK_RETURN
+            # 先只查 activity：还没回到父页面的 activity 时指纹不可能相同，省去一次界面抓取
+            activity = self._current_activity() if target_activity is not None else None
+            if activity == target_activity:
+                _, _, cur_fp = self.get_current_page_info(activity=activity)
+                if cur_fp == target_fp:
+                    return BackResult.OK_RETURN
 
             # ✅ 条件 2：网络已空闲，且刚才是“有效点击”
             if self.is_network_idle(1500):
@@ -678,15 +901,29 @@ class IntegratedCrawler:
 
     def handle_popup(self) -> bool:
         """处理弹窗"""
-        _, elements, _ = self.get_current_page_info()
-        popup_keywords = ["允许", "拒绝", "确定", "取消", "继续", "跳过", "关闭", "我知道了"]
+        cached = self._page_cache
+        if cached is not None and time.monotonic() - self._page_cache_ts < self.PAGE_CACHE_TTL:
+            # 刚获取过页面信息（期间没有点击/返回），直接复用
+            elements = cached[1]
+        else:
+            xml = self.dump_ui()
+            # 先在原始 XML 上做子串预筛：没有任何弹窗按钮文字就不必解析
+            if not xml or not any(k in xml for k in self.POPUP_KEYWORDS):
+                return False
+            
+            try:
+                elements = self.parser.parse_xml_string(xml)
+            except Exception as e:
+                print(f"⚠️ 获取页面信息失败: {e}")
+                return False
         
         for elem in elements:
             text = elem.get("text", "")
-            if text in popup_keywords:
+            if text in self.POPUP_KEYWORDS:
                 print(f"⚡ 发现弹窗按钮: {text}")
                 x, y = elem["coords"]
-                os.system(f"adb shell input tap {x} {y}")
+                self.adb.run(f"input tap {x} {y}")
+                self._invalidate_page_cache()
                 self.stats["popups_handled"] += 1
                 time.sleep(1)
                 return True
@@ -720,6 +957,7 @@ class IntegratedCrawler:
                 time.sleep(0.5)
 
             clicked_in_this_page = set()
+            clicked_coords = set()  # 已点击元素的坐标，用于快速预筛
 
             # ✅ 主遍历循环（在 try 内）
             while True:
@@ -742,20 +980,24 @@ class IntegratedCrawler:
                             return
                         continue
 
-                # 找出未点击的元素
-                unclicked = []
-                for elem in clickable_elements:
-                    sig = self._get_element_signature(elem)
-                    if sig not in clicked_in_this_page:
-                        unclicked.append(elem)
+                # 找出第一个未点击的元素
+                # 坐标没点过的元素一定没点过，只有坐标命中时才需要计算完整签名
+                elem = None
+                for candidate in clickable_elements:
+                    coords = tuple(candidate.get("coords", (0, 0)))
+                    if coords not in clicked_coords:
+                        elem = candidate
+                        break
+                    if self._get_element_signature(candidate) not in clicked_in_this_page:
+                        elem = candidate
+                        break
 
-                if not unclicked:
+                if elem is None:
                     print(f"{'  ' * depth}✓ 当前页面遍历完成")
                     return
 
-                elem = unclicked[0]
-                elem_sig = self._get_element_signature(elem)
-                clicked_in_this_page.add(elem_sig)
+                clicked_in_this_page.add(self._get_element_signature(elem))
+                clicked_coords.add(coords)
 
                 # 点击前先处理弹窗
                 while self.handle_popup():
@@ -862,6 +1104,10 @@ class IntegratedCrawler:
             self.stop()
     
     def stop(self):
+        self.page_pool.shutdown(wait=True)
+        self.click_logger.flush()
+        self.request_monitor.close()
+        self.adb.close()
         if self.driver:
             self.driver.quit()
             print("🔚 Appium Driver 已关闭")
@@ -0,0 +1,30 @@
+# json_utils.py
+# ================== JSON 读写 ==================
+# 优先 orjson（Rust 实现，直接读写 UTF-8 bytes），未安装或它不接受的输入交给标准库
+
+import json
+
+try:
+    import orjson
+except ImportError:                     # 未安装 orjson 时退回标准库
+    orjson = None
+
+
+def json_loads(data):
+    """解析 JSON（str 或 bytes）：优先 orjson，它拒绝的输入（如 NaN/Infinity 字面量）交给标准库"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """序列化为紧凑的 UTF-8 JSON bytes（不转义非 ASCII）：优先 orjson，失败时交给标准库"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -21,17 +21,22 @@ print("3. 或者暂时不抓包,只测试遍历功能")
 input("\n确认后回车开始...")
 
 
-requests.get(
-    "http://mark.local/__start_session__",
-    proxies={
-        "http": "http://127.0.0.1:8080",
-        "https": "http://127.0.0.1:8080",
-    },
-    timeout=2
-)
-
 session_file = "log/current_mitm_session.json"
 
+
+# 通知 mitmproxy 开启新 session（mitm 未启动时忽略，只做 UI 遍历）
+try:
+    requests.get(
+        "http://mark.local/__start_session__",
+        proxies={
+            "http": "http://127.0.0.1:8080",
+            "https": "http://127.0.0.1:8080",
+        },
+        timeout=2
+    )
+except requests.RequestException:
+    pass
+
 if os.path.exists(session_file):
     with open(session_file, "r", encoding="utf-8") as f:
         mitm_session = json.load(f)
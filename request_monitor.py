@@ -4,9 +4,63 @@
 用于分析 mitmproxy 捕获的请求，判断点击有效性
 """
 
-import json
 import fnmatch
-from typing import Dict, List, Literal
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterator, List, Literal, NamedTuple, Optional, Union
+
+from json_utils import json_loads
+
+
+# 不解析整行，直接从原文取出 timestamp 字段
+_TS_RE = re.compile(rb'"timestamp"\s*:\s*(-?\d+(?:\.\d+)?)')
+
+
+def _line_timestamp(line: bytes):
+    """从日志行原文中取 timestamp，取不到时返回 None"""
+    m = _TS_RE.search(line)
+    if m is None:
+        return None
+    ts = m.group(1)
+    return float(ts) if b"." in ts else int(ts)
+
+
+# 同样直接从原文取 host（不含转义字符的才取，否则交给完整解析）
+_HOST_RE = re.compile(rb'"host"\s*:\s*"([^"\\]*)"')
+
+
+def _line_host(line: bytes):
+    """从日志行原文中取 host，取不到时返回 None"""
+    m = _HOST_RE.search(line)
+    if m is None:
+        return None
+    try:
+        return m.group(1).decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+class RequestRecord(NamedTuple):
+    """一条已解析的请求：只保留点击检测与点击日志用到的字段"""
+    timestamp: float
+    host: Optional[str]
+    method: Optional[str]
+    path: str
+    url: str
+    classified_type: str
+
+
+def _request_line(req: RequestRecord) -> str:
+    """调试输出中的一行请求摘要：METHOD host/path"""
+    return f"       - {req.method} {req.host}{req.path}"
 
 
 class RequestClassifier:
@@ -16,9 +70,7 @@ class RequestClassifier:
     BUSINESS_DOMAINS = [
         "*.chinamobile.com",
         "*.cmcc.com",
-        "*.mcloud.com",
-        "*mcloud*",  # 包含 mcloud 的域名
-        "ad.mcloud.139.com",
+        "*mcloud*",  # 包含 mcloud 的域名（已覆盖 *.mcloud.com、ypqy.mcloud.139.com；ad.mcloud.139.com 先命中噪音 ad.*，仍归为噪音）
         "data.cmicapm.com",
         "ai.yun.139.com",
         "group.yun.139.com",
@@ -28,7 +80,6 @@ class RequestClassifier:
         "ose.caiyun.feixin.10086.cn",
         "personal-kd-njs.yun.139.com",
         "vsbo.caiyun.feixin.10086.cn",
-        "ypqy.mcloud.139.com",
         "ael.yun.139.com"
     ]
     
@@ -79,6 +130,65 @@ class RequestClassifier:
         "*.alicdn.com",
     ]
     
+    # 各类域名模式编译后的匹配器，首次分类时生成
+    _matchers = None
+    
+    @staticmethod
+    def _compile_globs(patterns: List[str]) -> Callable[[str], bool]:
+        """
+        把一组通配符模式编译成一个匹配函数（与 fnmatch.fnmatch 语义一致）
+        常见的 精确域名 / *.后缀 / 前缀.* / *关键字* 分别用集合和 str 方法判断，
+        其余模式才合并成正则
+        """
+        exact, prefixes, suffixes, substrings, globs = set(), [], [], [], []
+        for p in patterns:
+            core = p.strip("*")
+            if any(c in core for c in "*?["):
+                globs.append(p)
+            elif p == core:
+                exact.add(p)
+            elif p == "*" + core:
+                suffixes.append(core)
+            elif p == core + "*":
+                prefixes.append(core)
+            elif p == "*" + core + "*":
+                substrings.append(core)
+            else:
+                globs.append(p)  # 如 **x：交给正则
+        
+        exact = frozenset(exact)
+        prefixes, suffixes, substrings = tuple(prefixes), tuple(suffixes), tuple(substrings)
+        glob_re = re.compile("|".join(fnmatch.translate(p) for p in globs)) if globs else None
+        
+        def match(host: str) -> bool:
+            return (host in exact
+                    or host.startswith(prefixes)
+                    or host.endswith(suffixes)
+                    or any(s in host for s in substrings)
+                    or (glob_re is not None and glob_re.match(host) is not None))
+        
+        return match
+    
+    @staticmethod
+    def _compile_cores(patterns: List[str]) -> "re.Pattern":
+        """把各模式去掉 * 后的字面部分合并成一个正则，一次 search 判断 host 是否包含其中任意一个"""
+        if not patterns:
+            return re.compile(r"(?!)")  # 空列表：永不匹配
+        cores = sorted({p.replace("*", "") for p in patterns})
+        return re.compile("|".join(re.escape(c) for c in cores))
+    
+    @classmethod
+    def _get_matchers(cls):
+        if cls._matchers is None:
+            cls._matchers = (
+                cls._compile_globs(cls.BURYING_DOMAINS),
+                cls._compile_cores(cls.BURYING_DOMAINS),
+                cls._compile_globs(cls.NOISE_DOMAINS),
+                cls._compile_globs(cls.BUSINESS_DOMAINS),
+                cls._compile_cores(cls.BUSINESS_DOMAINS),
+            )
+        return cls._matchers
+    
     @classmethod
     def classify_request(cls, host: str, url: str) -> Literal["business", "burying", "noise"]:
         """
@@ -93,28 +203,76 @@ class RequestClassifier:
             "burying": 埋点请求
             "noise": 噪音请求
         """
+        # 分类只看 host（url 未参与判断），同一 host 只匹配一次
+        return cls._classify_host(host)
+    
+    @classmethod
+    @lru_cache(maxsize=8192)
+    def _classify_host(cls, host: str) -> Literal["business", "burying", "noise"]:
+        burying_match, burying_cores, noise_match, business_match, business_cores = cls._get_matchers()
+        
         # 1. 先检查埋点域名（最高优先级）
-        for pattern in cls.BURYING_DOMAINS:
-            if fnmatch.fnmatch(host, pattern) or pattern.replace("*", "") in host:
-                return "burying"
+        if burying_match(host) or burying_cores.search(host):
+            return "burying"
         
         # 2. 检查噪音域名
-        for pattern in cls.NOISE_DOMAINS:
-            if fnmatch.fnmatch(host, pattern):
-                return "noise"
+        if noise_match(host):
+            return "noise"
         
         # 3. 检查业务域名
-        for pattern in cls.BUSINESS_DOMAINS:
-            if fnmatch.fnmatch(host, pattern) or pattern.replace("*", "") in host:
-                return "business"
+        if business_match(host) or business_cores.search(host):
+            return "business"
         
         # 4. 默认当作噪音（保守策略）
         return "noise"
 
 
+class ActionMarker:
+    """
+    点击行为标记 - 爬虫与 mitm 插件之间的共享内存信号
+    
+    双方映射同一个 8 字节文件，爬虫写入最近一次点击的毫秒时间戳，
+    插件直接读取；每次点击只是一次内存拷贝，不再经代理发 HTTP 请求
+    """
+    
+    DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "mitm_last_action")
+    _FORMAT = "<Q"  # 小端无符号 64 位整数（毫秒时间戳）
+    _SIZE = struct.calcsize(_FORMAT)
+    
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: 共享文件路径，爬虫与插件需一致
+        """
+        self.path = path or self.DEFAULT_PATH
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self._SIZE:
+                os.ftruncate(fd, self._SIZE)
+            self._mm = mmap.mmap(fd, self._SIZE)
+        finally:
+            os.close(fd)
+    
+    def mark(self, ts_ms: int = None):
+        """记录一次点击（默认取当前时间）"""
+        if ts_ms is None:
+            ts_ms = int(time.time() * 1000)
+        struct.pack_into(self._FORMAT, self._mm, 0, ts_ms)
+    
+    def last_action_ms(self) -> int:
+        """最近一次点击的毫秒时间戳，从未标记过时为 0"""
+        return struct.unpack_from(self._FORMAT, self._mm, 0)[0]
+    
+    def close(self):
+        self._mm.close()
+
+
 class RequestMonitor:
     """请求监控器 - 从 mitmproxy 日志读取并分析"""
     
+    # 只保留最新请求之前这么久（毫秒）的日志，更早的从内存中丢弃（点击检测只查最近几秒）
+    KEEP_MS = 5 * 60 * 1000
+    
     def __init__(self, log_file: str = "/tmp/mitm_requests.jsonl"):
         """
         初始化请求监控器
@@ -124,6 +282,138 @@ class RequestMonitor:
         """
         self.log_file = log_file
         self.classifier = RequestClassifier()
+        
+        # 已读入的日志：按时间戳排序的请求（尚未解析的保留原文 bytes，解析失败的为 None）
+        # 及其时间戳列表，以及已读到的文件位置（只读新追加的部分）
+        self._file_id = None
+        self._fh = None           # 日志文件句柄，打开一次后一直复用
+        self._offset = 0
+        self._records: List[Union[bytes, RequestRecord, None]] = []
+        self._timestamps: List[float] = []
+    
+    def _reset(self):
+        self.close()
+        self._file_id = None
+        self._offset = 0
+        self._records, self._timestamps = [], []
+    
+    def _load(self):
+        """增量读取日志：只解析上次读到的位置之后新追加的完整行"""
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            # 文件不存在，视为没有请求
+            self._reset()
+            return
+        
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._offset:
+            # 换了文件或文件被截断：从头读
+            self._reset()
+            self._file_id = file_id
+        if st.st_size == self._offset:
+            return
+        
+        if self._fh is None:
+            self._fh = open(self.log_file, "rb")
+        self._fh.seek(self._offset)
+        chunk = self._fh.read()
+        
+        # 只处理完整的行，末尾写了一半的行留到下次
+        end = chunk.rfind(b"\n") + 1
+        if not end:
+            return
+        self._offset += end
+        
+        # 先只取时间戳，整行保留原文，落入查询窗口时才解析（见 iter_requests_in_window）
+        new_entries = []
+        for line in chunk[:end].split(b"\n"):
+            if line[:1] != b"{":
+                line = line.strip()
+                if not line:
+                    continue
+            ts = _line_timestamp(line)
+            if ts is None:
+                # 原文里找不到时间戳：直接解析
+                line = self._parse_record(line)
+                if line is None:
+                    continue
+                ts = line.timestamp
+            new_entries.append((ts, line))
+        if not new_entries:
+            return
+        
+        # 按时间戳排序（稳定排序，同一时间戳保持写入顺序），窗口查询用二分
+        new_entries.sort(key=itemgetter(0))
+        if self._timestamps and new_entries[0][0] < self._timestamps[-1]:
+            # 新行比已有记录更早（少见）：整体重排
+            entries = list(zip(self._timestamps, self._records))
+            entries += new_entries
+            entries.sort(key=itemgetter(0))
+            self._timestamps = [ts for ts, _ in entries]
+            self._records = [rec for _, rec in entries]
+        else:
+            self._timestamps += [ts for ts, _ in new_entries]
+            self._records += [rec for _, rec in new_entries]
+        
+        # 丢弃超出保留时长的旧记录；过期的超过一半时才整体截断，均摊下来每行 O(1)
+        cut = bisect_left(self._timestamps, self._timestamps[-1] - self.KEEP_MS)
+        if cut * 2 > len(self._timestamps):
+            del self._timestamps[:cut]
+            del self._records[:cut]
+    
+    def close(self):
+        """关闭日志文件句柄（之后再查询会重新打开）"""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+    
+    def _parse_record(self, line: bytes):
+        """解析一行日志，只保留用到的字段并完成分类，解析失败返回 None"""
+        try:
+            req = json_loads(line)
+        except ValueError:
+            return None
+        get = req.get
+        host = get("host")
+        url = get("url", "")
+        return RequestRecord(
+            get("timestamp", 0), host, get("method"), get("path", ""), url,
+            self.classifier.classify_request(host or "", url),
+        )
+    
+    def iter_requests_in_window(self, start_ts: float, end_ts: float) -> Iterator[RequestRecord]:
+        """逐条产出时间窗口 [start_ts, end_ts] 内已解析、已分类的请求（按时间戳顺序）"""
+        self._load()
+        
+        lo = bisect_left(self._timestamps, start_ts)
+        hi = bisect_right(self._timestamps, end_ts)
+        
+        records = self._records
+        timestamps = self._timestamps
+        classify = self.classifier.classify_request
+        for i in range(lo, hi):
+            req = records[i]
+            if req.__class__ is bytes:
+                # 首次落入窗口：噪音请求只计数，按原文里的 host 分类后不再解析整行；
+                # 其余解析原文并替换，解析失败的行记为 None
+                host = _line_host(req)
+                if host is not None and classify(host, "") == "noise":
+                    req = RequestRecord(timestamps[i], host, None, "", "", "noise")
+                else:
+                    req = self._parse_record(req)
+                records[i] = req
+            if req is not None:
+                yield req
+    
+    def count_requests_in_window(self, start_ts: float, end_ts: float) -> Counter:
+        """
+        只统计时间窗口内各类请求的数量，不构造请求列表
+        
+        Returns:
+            Counter({"business": n, "burying": n, "noise": n})
+        """
+        return Counter(map(attrgetter("classified_type"), self.iter_requests_in_window(start_ts, end_ts)))
     
     def get_requests_in_window(self, start_ts: float, end_ts: float) -> Dict:
         """
@@ -137,54 +427,50 @@ class RequestMonitor:
             {
                 "business": [...],  # 业务请求
                 "burying": [...],   # 埋点请求
-                "noise": [...],     # 噪音请求
+                "noise_count": int, # 噪音请求数（只用于统计，不保留明细）
             }
         """
         business_reqs = []
         burying_reqs = []
-        noise_reqs = []
+        noise_count = 0
         
-        try:
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    
-                    try:
-                        req = json.loads(line)
-                        ts = req.get("timestamp", 0)
-                        
-                        # 在时间窗口内
-                        if start_ts <= ts <= end_ts:
-                            host = req.get("host", "")
-                            url = req.get("url", "")
-                            
-                            # 分类
-                            req_type = self.classifier.classify_request(host, url)
-                            req["classified_type"] = req_type
-                            
-                            if req_type == "business":
-                                business_reqs.append(req)
-                            elif req_type == "burying":
-                                burying_reqs.append(req)
-                            else:
-                                noise_reqs.append(req)
-                    
-                    except json.JSONDecodeError:
-                        continue
-        
-        except FileNotFoundError:
-            # 文件不存在，返回空结果
-            pass
+        for req in self.iter_requests_in_window(start_ts, end_ts):
+            req_type = req.classified_type
+            if req_type == "business":
+                business_reqs.append(req)
+            elif req_type == "burying":
+                burying_reqs.append(req)
+            else:
+                noise_count += 1
         
         return {
             "business": business_reqs,
             "burying": burying_reqs,
-            "noise": noise_reqs,
+            "noise_count": noise_count,
         }
     
+    @staticmethod
+    def _format_debug(result: Dict, noise_count: int) -> str:
+        """拼出调试输出的全部内容，由调用方一次 print 写出（只在 debug 时调用）"""
+        lines = [
+            "  📊 请求分析:",
+            f"     业务请求: {result['business_count']} 个",
+            f"     埋点请求: {result['burying_count']} 个",
+            f"     噪音请求: {noise_count} 个 (已过滤)",
+        ]
+        
+        if result['business_count'] > 0:
+            lines.append("     业务请求列表:")
+            lines += map(_request_line, result["business_requests"][:3])  # 只显示前3个
+        
+        if result['burying_count'] > 0:
+            lines.append("     埋点请求列表:")
+            lines += map(_request_line, result["burying_requests"])
+        
+        return "\n".join(lines)
+    
     def check_click_effect(self, start_ts: float, duration: float = 3000, 
-                          debug: bool = False) -> Dict:
+                          debug: bool = False, counts_only: bool = False) -> Dict:
         """
         检查点击效果
         
@@ -192,6 +478,7 @@ class RequestMonitor:
             start_ts: 点击时间戳（毫秒）
             duration: 检测时长（毫秒），默认3秒
             debug: 是否输出调试信息
+            counts_only: 只统计数量（用于轮询），返回的请求列表为空
         
         Returns:
             {
@@ -204,31 +491,34 @@ class RequestMonitor:
             }
         """
         end_ts = start_ts + duration
+        
+        if counts_only:
+            counts = self.count_requests_in_window(start_ts, end_ts)
+            return {
+                "has_business": counts["business"] > 0,
+                "has_burying": counts["burying"] > 0,
+                "business_count": counts["business"],
+                "burying_count": counts["burying"],
+                "business_requests": [],
+                "burying_requests": [],
+            }
+        
         requests = self.get_requests_in_window(start_ts, end_ts)
+        business_reqs = requests["business"]
+        burying_reqs = requests["burying"]
+        business_count = len(business_reqs)
+        burying_count = len(burying_reqs)
         
         result = {
-            "has_business": len(requests["business"]) > 0,
-            "has_burying": len(requests["burying"]) > 0,
-            "business_count": len(requests["business"]),
-            "burying_count": len(requests["burying"]),
-            "business_requests": requests["business"],
-            "burying_requests": requests["burying"],
+            "has_business": business_count > 0,
+            "has_burying": burying_count > 0,
+            "business_count": business_count,
+            "burying_count": burying_count,
+            "business_requests": business_reqs,
+            "burying_requests": burying_reqs,
         }
         
         if debug:
-            print(f"  📊 请求分析:")
-            print(f"     业务请求: {result['business_count']} 个")
-            print(f"     埋点请求: {result['burying_count']} 个")
-            print(f"     噪音请求: {len(requests['noise'])} 个 (已过滤)")
-            
-            if result['business_count'] > 0:
-                print(f"     业务请求列表:")
-                for req in requests["business"][:3]:  # 只显示前3个
-                    print(f"       - {req.get('method')} {req.get('host')}{req.get('path', '')}")
-            
-            if result['burying_count'] > 0:
-                print(f"     埋点请求列表:")
-                for req in requests["burying"]:
-                    print(f"       - {req.get('method')} {req.get('host')}{req.get('path', '')}")
+            print(self._format_debug(result, requests["noise_count"]))
         
         return result
\ No newline at end of file